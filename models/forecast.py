@@ -0,0 +1,260 @@
+"""
+models/forecast.py
+
+Online re-forecast: collapse risk from an observed mid-mission state.
+
+simulate() always starts from the design storage at t=0. forecast() instead starts from
+a ForecastState (day, measured stocks, accumulated dose, next launch window) and runs a
+batched Monte Carlo continuation to the end of the scenario horizon.
+
+Between launch windows every stock only loses its constant net draw, so the depletion
+step of each sample is solved in closed form; the only loop is over the remaining
+windows, vectorized across all samples. The stepping matches simulate() (a store is
+depleted at the first step where it is <= 0; imports multiply the remaining stock at a
+successful window). A stock that hits exactly zero can land one step apart, since
+simulate() accumulates the draw with a cumsum.
+
+Window outcomes are common random numbers: the uniforms of the window at step w are
+drawn from default_rng([seed, w]), so successive forecasts differ only through the
+observed state, not through Monte Carlo noise.
+
+Forecaster is the streaming interface: observe() takes each new state and reuses the
+cached continuation samples when the state matches the previous forecast's projection
+(same next window, no window crossed, stocks within `tolerance_days`).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Mapping, Sequence
+
+import numpy as np
+
+from .model import (
+    Scenario,
+    _accumulate_dose,
+    _validate_scenario,
+    _window_steps,
+    resource_table,
+    simulate_steps,
+)
+from .verified_constants import RAD_CRUISE_DOSE_EQUIV_MSV_PER_DAY, RAD_SURFACE_DOSE_EQUIV_MSV_PER_DAY
+
+DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+
+@dataclass(frozen=True)
+class ForecastState:
+    """
+    Observed state at `day` (days since mission start).
+
+    stock_days: measured stock per resource in days of demand coverage, keyed like
+                resource_table(sc).names ("o2", "water", extras).
+    next_window_day: next launch window; None = the scenario's schedule. Later windows
+                keep the scenario's cadence relative to it.
+    """
+    day: float
+    stock_days: Mapping[str, float]
+    dose_msv: float
+    next_window_day: float | None = None
+
+@dataclass(frozen=True)
+class Forecast:
+    day: float
+    samples: int
+    collapse_probability: float
+    # Days from `day` until the first store is depleted; None = beyond the horizon.
+    depletion_quantiles: dict
+    # Fraction of samples collapsing on each resource (first depleted store).
+    collapse_resource_share: dict
+    dose_msv_mean: float
+    # True if the continuation samples of the previous forecast were reused.
+    reused: bool = False
+
+def state_from_run(sc: Scenario, res: dict, day: float) -> ForecastState:
+    """State of a simulate() result at `day` (e.g. to start forecasting from a planning run)."""
+    t_days = res["t_days"]
+    i = int(round(day / sc.dt_days))
+    if not 0 <= i < len(t_days):
+        raise ValueError("day is outside the run")
+    windows = _window_steps(sc, t_days)
+    later = windows[windows > i]
+    return ForecastState(
+        day=float(t_days[i]),
+        stock_days={name: float(res["stock_days"][k, i]) for k, name in enumerate(res["resources"])},
+        dose_msv=_accumulate_dose(sc, t_days, i),
+        next_window_day=float(t_days[later[0]]) if later.size else None,
+    )
+
+def _window_uniforms(seed: int, w: int, samples: int) -> np.ndarray:
+    return np.random.default_rng([seed, w]).random(samples)
+
+@dataclass
+class _Continuation:
+    """Per-sample outcome of one continuation run (absolute steps; inf = survives)."""
+    step: int
+    stock: np.ndarray
+    windows: np.ndarray
+    collapse_step: np.ndarray
+    collapse_index: np.ndarray
+
+class Forecaster:
+    """
+    Usage:
+        fc = Forecaster(sc, samples=4096)
+        f = fc.observe(ForecastState(day=400, stock_days={"o2": 120, "water": 95}, dose_msv=150))
+        f.collapse_probability, f.depletion_quantiles
+
+    Window draws are cached per window step and dropped once the window is in the past.
+    """
+
+    def __init__(self, sc: Scenario, samples: int = 4096, seed: int = 0,
+                 quantiles: Sequence[float] = DEFAULT_QUANTILES, tolerance_days: float = 1e-3) -> None:
+        _validate_scenario(sc)
+        if samples < 1:
+            raise ValueError("samples must be >= 1")
+        self.sc = sc
+        self.samples = samples
+        self.seed = seed
+        self.quantiles = tuple(quantiles)
+        self.tolerance_days = tolerance_days
+        self.state: ForecastState | None = None
+        self.last: Forecast | None = None
+
+        self._table = resource_table(sc)
+        self._draw = self._table.net_draw_fraction * (sc.dt_days / 1.0)
+        self._growth = 1.0 + self._table.import_restore_fraction
+        self._last_step = simulate_steps(sc) - 1
+        t_days = np.arange(self._last_step + 1) * sc.dt_days
+        self._t_days = t_days
+        self._grid_windows = _window_steps(sc, t_days)
+        # Dose through step i for the continuation: dose(state) + cum[i] - cum[state step].
+        rate = np.where(t_days < sc.cruise_days, RAD_CRUISE_DOSE_EQUIV_MSV_PER_DAY.value,
+                        RAD_SURFACE_DOSE_EQUIV_MSV_PER_DAY.value) * (sc.dt_days / 1.0)
+        self._dose_cum = np.cumsum(rate)
+        self._uniforms: dict[int, np.ndarray] = {}
+        self._cont: _Continuation | None = None
+
+    # ---- state handling -------------------------------------------------
+
+    def _step(self, day: float) -> int:
+        return int(round(day / self.sc.dt_days))
+
+    def _stock_vector(self, state: ForecastState) -> np.ndarray:
+        names = self._table.names
+        if set(state.stock_days) != set(names):
+            raise ValueError(f"stock_days must give exactly the resources {names}")
+        return np.array([float(state.stock_days[n]) for n in names])
+
+    def _windows(self, state: ForecastState, step: int) -> np.ndarray:
+        grid = self._grid_windows[self._grid_windows > step]
+        if state.next_window_day is None:
+            return grid
+        if state.next_window_day <= state.day:
+            raise ValueError("next_window_day must be after day")
+        # A moved window moves the rest of the schedule with it.
+        nxt = self._step(state.next_window_day)
+        windows = grid + (nxt - grid[0]) if grid.size else np.array([nxt], dtype=np.int64)
+        return windows[(windows > step) & (windows <= self._last_step)]
+
+    def _uniforms_at(self, w: int) -> np.ndarray:
+        u = self._uniforms.get(w)
+        if u is None:
+            u = self._uniforms[w] = _window_uniforms(self.seed, w, self.samples)
+        return u
+
+    # ---- continuation ---------------------------------------------------
+
+    def _run(self, step: int, stock0: np.ndarray, windows: np.ndarray) -> _Continuation:
+        n, n_res = self.samples, len(self._table.names)
+        draw = self._draw
+        stock = np.broadcast_to(stock0, (n, n_res)).copy()
+        alive = np.ones(n, dtype=bool)
+        collapse_step = np.full(n, np.inf)
+        collapse_index = np.full(n, -1, dtype=np.int64)
+
+        cur = step
+        p = self.sc.missed_window_probability
+        for w, is_window in [*((int(w), True) for w in windows), (self._last_step, False)]:
+            if w < cur or not alive.any():
+                continue
+            # Steps until each store reaches <= 0 under its constant draw (0 = already empty).
+            with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                k = np.where(draw > 0.0, np.ceil(stock / np.where(draw > 0.0, draw, 1.0)), np.inf)
+                # The quotient can round across an exact hit (e.g. 149.8 / 0.2); snap to the step grid.
+                k = np.where(stock - (k - 1.0) * draw <= 0.0, k - 1.0, k)
+                k = np.where(stock - k * draw > 0.0, k + 1.0, k)
+            k = np.where(stock <= 0.0, 0.0, np.maximum(k, 1.0))
+            first = np.argmin(k, axis=1)
+            k_min = k[np.arange(n), first]
+            dies = alive & (k_min <= w - cur)
+            collapse_step[dies] = cur + k_min[dies]
+            collapse_index[dies] = first[dies]
+            alive &= ~dies
+
+            stock -= (w - cur) * draw
+            if is_window:
+                ok = alive & (self._uniforms_at(w) >= p)
+                with np.errstate(over="ignore"):
+                    stock[ok] *= self._growth
+            cur = w
+        return _Continuation(step, stock0, windows, collapse_step, collapse_index)
+
+    def _reusable(self, step: int, stock: np.ndarray, windows: np.ndarray) -> bool:
+        c = self._cont
+        if c is None or step < c.step or not np.array_equal(windows, c.windows[c.windows > step]):
+            return False
+        if c.windows.size and c.windows[0] <= step:
+            return False
+        projected = c.stock - (step - c.step) * self._draw
+        return bool(np.all(np.abs(stock - projected) <= self.tolerance_days))
+
+    def _summarize(self, state: ForecastState, step: int, reused: bool) -> Forecast:
+        c = self._cont
+        collapsed = np.isfinite(c.collapse_step)
+        ttd = (c.collapse_step - step) * self.sc.dt_days
+        qs = np.quantile(ttd, self.quantiles, method="inverted_cdf") if self.quantiles else []
+        last = np.where(collapsed, c.collapse_step, self._last_step).astype(np.int64)
+        dose = state.dose_msv + self._dose_cum[last] - self._dose_cum[step]
+        shares = {
+            name: float(np.mean(c.collapse_index == k)) for k, name in enumerate(self._table.names)
+        }
+        return Forecast(
+            day=state.day,
+            samples=self.samples,
+            collapse_probability=float(collapsed.mean()),
+            depletion_quantiles={q: (float(v) if np.isfinite(v) else None) for q, v in zip(self.quantiles, qs)},
+            collapse_resource_share=shares,
+            dose_msv_mean=float(dose.mean()),
+            reused=reused,
+        )
+
+    # ---- public API -----------------------------------------------------
+
+    def observe(self, state: ForecastState) -> Forecast:
+        step = self._step(state.day)
+        if not 0 <= step <= self._last_step:
+            raise ValueError("day is outside the scenario horizon")
+        stock = self._stock_vector(state)
+        windows = self._windows(state, step)
+
+        reused = self._reusable(step, stock, windows)
+        if not reused:
+            self._cont = self._run(step, stock, windows)
+        # Past windows never come back (new dates get new draws).
+        for w in [w for w in self._uniforms if w <= step]:
+            del self._uniforms[w]
+
+        self.state = state
+        self.last = self._summarize(state, step, reused)
+        return self.last
+
+    def update(self, **changes) -> Forecast:
+        """observe() the last state with some fields replaced (e.g. day=..., stock_days=...)."""
+        if self.state is None:
+            raise RuntimeError("observe() a full state first")
+        return self.observe(replace(self.state, **changes))
+
+def forecast(sc: Scenario, state: ForecastState, samples: int = 4096, seed: int = 0,
+             quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Forecast:
+    """One-shot forecast; use Forecaster for a stream of observations."""
+    return Forecaster(sc, samples, seed, quantiles).observe(state)
@@ -0,0 +1,219 @@
+"""
+models/incremental.py
+
+Incremental re-simulation for edit-and-rerun loops.
+
+IncrementalSimulator keeps the last run's series, the engine state at every launch
+window (WindowCheckpoint) and the end state. When a Scenario field changes, FIELD_EFFECTS
+says which part of the result that field can touch; the simulator finds the first step
+whose trajectory can differ and re-runs only from the checkpoint before it. Edits that
+touch only scalar sub-results (cruise_days -> dose, N0 -> demand) never re-run the stocks.
+
+Every result is bit-identical to simulate(sc, seed) for the same inputs.
+"""
+
+from __future__ import annotations
+
+from dataclasses import fields, replace
+
+import numpy as np
+
+from .model import (
+    Scenario,
+    WindowCheckpoint,
+    _accumulate_dose,
+    _assemble_result,
+    _run_stocks,
+    _validate_scenario,
+    resource_table,
+    simulate_steps,
+)
+
+# What each Scenario field can affect:
+#   "demand"   - kg/day outputs only
+#   "dose"     - dose bookkeeping only
+#   "horizon"  - stocks beyond the shorter of the old/new horizons
+#   "windows"  - stocks from the first launch window (old or new cadence)
+#   "outcomes" - stocks from the first window whose success/miss flips
+#   "imports"  - stocks from the first successful window
+#   "all"      - the whole trajectory
+FIELD_EFFECTS: dict[str, str] = {
+    "N0": "demand",
+    "years": "horizon",
+    "dt_days": "all",
+    "o2_storage_days": "all",
+    "water_storage_days": "all",
+    "o2_local_fraction": "all",
+    "water_local_fraction": "all",
+    "water_recovery_fraction": "all",
+    "launch_window_days": "windows",
+    "missed_window_probability": "outcomes",
+    "import_restore_fraction_o2": "imports",
+    "import_restore_fraction_water": "imports",
+    "cruise_days": "dose",
+    "extra_resources": "all",
+}
+
+assert set(FIELD_EFFECTS) == {f.name for f in fields(Scenario)}, "FIELD_EFFECTS out of sync with Scenario"
+
+def _first_window_step(t_days, launch_window_days: int) -> int:
+    if launch_window_days <= 0:
+        return len(t_days)
+    hits = np.flatnonzero((t_days[1:].astype(np.int64) % launch_window_days) == 0)
+    return int(hits[0]) + 1 if hits.size else len(t_days)
+
+class IncrementalSimulator:
+    """
+    Usage:
+        inc = IncrementalSimulator(sc, seed=123)
+        res = inc.result
+        res = inc.update(cruise_days=180)          # dose only, no stock loop
+        res = inc.update(missed_window_probability=0.3)  # resumes at first flipped window
+
+    `last_resume_step` is the step the last evaluation re-ran from
+    (None if the stock trajectory was reused as-is).
+    """
+
+    def __init__(self, sc: Scenario, seed: int = 123) -> None:
+        self.seed = seed
+        self.last_resume_step: int | None = 0
+        self._full_run(sc)
+
+    # ---- full run -------------------------------------------------------
+
+    def _full_run(self, sc: Scenario) -> None:
+        _validate_scenario(sc)
+        steps = simulate_steps(sc)
+        self._table = resource_table(sc)
+        self._t_days = np.arange(steps) * sc.dt_days
+        self._series = np.zeros((len(self._table.names), steps))
+        self._checkpoints: list[WindowCheckpoint] = []
+        rng = np.random.default_rng(self.seed)
+        self._finish(sc, rng, 0, self._table.storage_days, None)
+        self._dose = _accumulate_dose(sc, self._t_days, self._run.last_step)
+        self.sc = sc
+
+    def _finish(self, sc: Scenario, rng, start: int, stock_days, imported_days) -> None:
+        self.last_resume_step = start
+        self._table = resource_table(sc)
+        self._run = _run_stocks(
+            sc, self._table, rng, self._t_days, start, stock_days, self._series,
+            self._checkpoints, imported_days,
+        )
+        # End state lets a longer horizon continue without re-running anything.
+        self._tail = None if self._run.collapsed else (
+            len(self._t_days), self._run.stock_days, self._run.imported_days, rng.bit_generator.state,
+        )
+
+    # ---- invalidation ---------------------------------------------------
+
+    def _invalid_from(self, old: Scenario, new: Scenario, changed: list[str]) -> int:
+        """First step whose stock values may differ between old and new (len(t) = none)."""
+        n_old = len(self._t_days)
+        first = n_old
+        for name in changed:
+            effect = FIELD_EFFECTS[name]
+            if effect in ("demand", "dose"):
+                continue
+            if effect == "all":
+                return 0
+            if effect == "horizon":
+                first = min(first, simulate_steps(new))
+            elif effect == "windows":
+                first = min(first,
+                            _first_window_step(self._t_days, old.launch_window_days),
+                            _first_window_step(self._t_days, new.launch_window_days))
+            elif effect == "outcomes":
+                p0, p1 = old.missed_window_probability, new.missed_window_probability
+                for cp in self._checkpoints:
+                    if (cp.u >= p0) != (cp.u >= p1):
+                        first = min(first, cp.i)
+                        break
+            elif effect == "imports":
+                for cp in self._checkpoints:
+                    if cp.u >= old.missed_window_probability:
+                        first = min(first, cp.i)
+                        break
+        return first
+
+    # ---- public API -----------------------------------------------------
+
+    def update(self, **changes) -> dict:
+        return self.evaluate(replace(self.sc, **changes))
+
+    def evaluate(self, sc: Scenario) -> dict:
+        old = self.sc
+        changed = [f.name for f in fields(Scenario) if getattr(old, f.name) != getattr(sc, f.name)]
+        if not changed:
+            self.last_resume_step = None
+            return self.result
+        if any(FIELD_EFFECTS[n] == "all" for n in changed):
+            self._full_run(sc)
+            return self.result
+        _validate_scenario(sc)
+
+        invalid = self._invalid_from(old, sc, changed)
+        old_last_step = self._run.last_step
+        n_new = simulate_steps(sc)
+
+        if invalid > old_last_step and (self._run.collapsed or n_new == len(self._t_days)):
+            # Trajectory up to its end is untouched; only the clamp tail may need resizing.
+            self._resize(n_new)
+            self.last_resume_step = None
+        else:
+            self._resume(sc, min(invalid, n_new))
+
+        if self._run.last_step != old_last_step or "cruise_days" in changed or "years" in changed:
+            self._dose = _accumulate_dose(sc, self._t_days, self._run.last_step)
+        self._table = resource_table(sc)
+        self.sc = sc
+        return self.result
+
+    def _resize(self, n_new: int) -> None:
+        n_old = len(self._t_days)
+        if n_new == n_old:
+            return
+        series = np.empty((self._series.shape[0], n_new))
+        keep = min(n_old, n_new)
+        series[:, :keep] = self._series[:, :keep]
+        series[:, keep:] = self._series[:, -1:]
+        self._series = series
+        self._t_days = self._t_days[:n_new] if n_new < n_old else np.arange(n_new) * self.sc.dt_days
+
+    def _resume(self, sc: Scenario, invalid: int) -> None:
+        n_new = simulate_steps(sc)
+        # Latest saved state at or before the first invalid step.
+        state = None
+        if self._tail is not None and self._tail[0] <= invalid:
+            state = self._tail
+        else:
+            for cp in reversed(self._checkpoints):
+                if cp.i <= invalid:
+                    state = (cp.i, cp.stock_days, cp.imported_days, cp.rng_state)
+                    break
+
+        if state is None:
+            start, stock, imported = 0, resource_table(sc).storage_days, None
+            rng = np.random.default_rng(self.seed)
+        else:
+            start, stock, imported, rng_state = state
+            rng = np.random.default_rng()
+            rng.bit_generator.state = rng_state
+
+        series = np.empty((self._series.shape[0], n_new))
+        series[:, :start] = self._series[:, :start]
+        self._series = series
+        self._t_days = np.arange(n_new) * sc.dt_days
+        self._checkpoints = [cp for cp in self._checkpoints if cp.i < start]
+        self._finish(sc, rng, start, stock, imported)
+
+    @property
+    def result(self) -> dict:
+        """Same keys and values as simulate(self.sc, self.seed). Arrays are copies."""
+        run = self._run
+        return _assemble_result(
+            self.sc, self._table, self._t_days.copy(), self._series.copy(), replace(
+                run, stock_days=run.stock_days.copy(), imported_days=run.imported_days.copy(),
+            ),
+            self._dose,
+        )
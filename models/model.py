@@ -1,16 +1,17 @@
-# CONSERVATION-LAW BOOKKEEPING (strict baseline)
-# Conceptual updates (no hidden buffers):
-#   M_O2(t+dt)  = M_O2(t)  - N*c_O2*dt  + production_O2(t)  + resupply_O2(t)
-#   M_H2O(t+dt) = M_H2O(t) - N*c_H2O*dt + production_H2O(t) + resupply_H2O(t)
-# Collapse occurs when any critical store becomes negative.
-
+# CONSERVATION-LAW BOOKKEEPING (strict baseline)
+# Conceptual updates (no hidden buffers):
+#   M_O2(t+dt)  = M_O2(t)  - N*c_O2*dt  + production_O2(t)  + resupply_O2(t)
+#   M_H2O(t+dt) = M_H2O(t) - N*c_H2O*dt + production_H2O(t) + resupply_H2O(t)
+# Collapse occurs when any critical store becomes negative.
+
 """
 models/model.py
 
 Strict-by-construction simulator:
 - Uses ONLY verified constants from NASA/NTRS and other primary sources.
 - Refuses to run if any required parameter is missing or unverified.
-- Models 2 critical resources (O2, Water) + radiation dose bookkeeping + launch windows.
+- Models N critical resources (O2 and Water built in, extras via ResourceSpec)
+  + radiation dose bookkeeping + launch windows.
 
 This is a *foundational* model. It is intentionally limited to avoid speculative assumptions.
 """
@@ -20,6 +21,8 @@ import math
 import numpy as np
 
 from .verified_constants import (
+    VerifiedConstant,
+    is_registered,
     O2_KG_PER_CREW_MEMBER_DAY,
     WATER_KG_PER_CREW_MEMBER_DAY_BASELINE,
     ISS_WATER_RECOVERY_FRACTION,
@@ -27,6 +30,27 @@ from .verified_constants import (
     RAD_CRUISE_DOSE_EQUIV_MSV_PER_DAY,
 )
 
+# Units every resource demand constant must carry.
+DEMAND_UNITS = "kg/(crew-member*day)"
+
+# Bump whenever simulate() semantics change; recorded with catalogued runs.
+ENGINE_VERSION = "v0.0.3"
+
+@dataclass(frozen=True)
+class ResourceSpec:
+    """
+    An additional critical store, tracked like O2/water in "days of demand coverage".
+
+    demand must be a VerifiedConstant defined in verified_constants.py with units
+    DEMAND_UNITS; the remaining fields mirror the per-resource Scenario fields for O2/water.
+    """
+    name: str
+    demand: VerifiedConstant
+    storage_days: float
+    local_fraction: float
+    recovery_fraction: float = 0.0
+    import_restore_fraction: float = 0.0
+
 @dataclass(frozen=True)
 class Scenario:
     # Colony size (user-specified; not a "science constant")
@@ -62,6 +86,44 @@ class Scenario:
     # Radiation bookkeeping (not clinical risk): assume cruise for given days once at start.
     cruise_days: int
 
+    # Further critical stores (food, spares, ...) beyond the built-in O2 and water.
+    extra_resources: tuple[ResourceSpec, ...] = ()
+
+BUILTIN_RESOURCES = ("o2", "water")
+
+@dataclass(frozen=True)
+class ResourceTable:
+    """Per-resource parameters as aligned arrays (row order = names)."""
+    names: tuple[str, ...]
+    demand_kg_per_crew_day: np.ndarray
+    storage_days: np.ndarray
+    local_fraction: np.ndarray
+    recovery_fraction: np.ndarray
+    import_restore_fraction: np.ndarray
+
+    @property
+    def net_draw_fraction(self) -> np.ndarray:
+        # Effective local closure: local_fraction + recovery contribution.
+        # We treat recovery_fraction as a multiplier on the "non-local" portion, conservative:
+        # unmet portion = (1 - local_fraction); recovered portion reduces imports needed, not producing from nothing.
+        # Here we approximate: net draw from storage per day = (1 - local_fraction) * (1 - recovery_fraction).
+        # Oxygen: no general "98% recovery" claim is used (not verified in our allowed constants set) -> recovery 0.
+        return (1.0 - self.local_fraction) * (1.0 - self.recovery_fraction)
+
+def resource_table(sc: Scenario) -> ResourceTable:
+    rows = [
+        ("o2", O2_KG_PER_CREW_MEMBER_DAY.value, sc.o2_storage_days, sc.o2_local_fraction,
+         0.0, sc.import_restore_fraction_o2),
+        ("water", WATER_KG_PER_CREW_MEMBER_DAY_BASELINE.value, sc.water_storage_days, sc.water_local_fraction,
+         sc.water_recovery_fraction, sc.import_restore_fraction_water),
+    ]
+    rows += [
+        (r.name, r.demand.value, r.storage_days, r.local_fraction, r.recovery_fraction, r.import_restore_fraction)
+        for r in sc.extra_resources
+    ]
+    names, *cols = zip(*rows)
+    return ResourceTable(tuple(names), *(np.array(c, dtype=float) for c in cols))
+
 def _validate_scenario(sc: Scenario):
     if sc.N0 < 1:
         raise ValueError("N0 must be >= 1")
@@ -87,83 +149,194 @@ def _validate_scenario(sc: Scenario):
             "Provide a new verified source and update verified_constants.py."
         )
 
-def simulate(sc: Scenario, seed: int = 123):
+    seen = set(BUILTIN_RESOURCES)
+    for r in sc.extra_resources:
+        if not r.name.isidentifier() or r.name in seen:
+            raise ValueError(f"resource name {r.name!r} must be a unique identifier")
+        seen.add(r.name)
+        if not isinstance(r.demand, VerifiedConstant) or not is_registered(r.demand):
+            raise ValueError(f"{r.name}: demand must be a VerifiedConstant defined in verified_constants.py")
+        if r.demand.units != DEMAND_UNITS:
+            raise ValueError(f"{r.name}: demand {r.demand.name} is in {r.demand.units!r}, expected {DEMAND_UNITS!r}")
+        for name, v in [
+            ("local_fraction", r.local_fraction),
+            ("recovery_fraction", r.recovery_fraction),
+            ("import_restore_fraction", r.import_restore_fraction),
+        ]:
+            if not (0.0 <= v <= 1.0):
+                raise ValueError(f"{r.name}.{name} must be in [0,1]")
+        # ISS ECLSS is the only demonstrated recovery loop; it bounds any other loop too.
+        if r.recovery_fraction > ISS_WATER_RECOVERY_FRACTION.value + 1e-12:
+            raise ValueError(
+                f"{r.name}.recovery_fraction exceeds ISS demonstrated milestone ({ISS_WATER_RECOVERY_FRACTION.value})."
+            )
+
+def _series_buffer(out, shape: tuple[int, int]):
+    if out is None:
+        return np.zeros(shape)
+    if out.shape != shape:
+        raise ValueError(f"stocks_out must have shape {shape}, got {out.shape}")
+    return out
+
+def simulate_steps(sc: Scenario) -> int:
+    """Number of time steps simulate() produces for `sc` (length of every returned series)."""
+    return int(sc.years * 365.0 / sc.dt_days)
+
+@dataclass(frozen=True)
+class WindowCheckpoint:
+    """
+    Engine state at the *start* of launch-window step `i` (before that step's draw/import),
+    plus the uniform draw `u` the window consumed. Resuming from it reproduces the run exactly.
+    """
+    i: int
+    stock_days: np.ndarray
+    imported_days: np.ndarray
+    rng_state: dict
+    u: float
+
+@dataclass
+class StockRun:
+    collapsed: bool
+    collapse_day: float | None
+    collapse_resource: str | None
+    last_step: int
+    stock_days: np.ndarray
+    imported_days: np.ndarray
+
+def _window_steps(sc: Scenario, t_days) -> np.ndarray:
+    if sc.launch_window_days <= 0 or len(t_days) < 2:
+        return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero((t_days[1:].astype(np.int64) % sc.launch_window_days) == 0) + 1
+
+def _run_stocks(sc: Scenario, table: ResourceTable, rng, t_days, start: int, stock_days, series,
+                checkpoints: list | None = None, imported_days=None) -> StockRun:
+    """
+    Stock loop from step `start` to the end of the horizon (or collapse).
+
+    Works segment by segment between launch windows: within a segment every resource
+    only loses its constant net draw, so the whole (resources x steps) block is one
+    cumsum. cumsum adds left to right, so values are bit-identical to stepping
+    `stock -= draw * dt` one day at a time. At a window the stocks are multiplied by
+    (1 + import_restore_fraction) if the draw succeeds.
+
+    Writes series[:, start:] and returns a StockRun; imported_days is cumulative
+    resupply delivered at windows (days of demand). If `checkpoints` is a list, a
+    WindowCheckpoint is appended at every launch window reached.
+    """
+    steps = len(t_days)
+    n_res = len(table.names)
+    stock = np.array(stock_days, dtype=float)
+    imported = np.zeros(n_res) if imported_days is None else np.array(imported_days, dtype=float)
+    draw = table.net_draw_fraction * (sc.dt_days / 1.0)
+    growth = 1.0 + table.import_restore_fraction
+
+    windows = _window_steps(sc, t_days)
+    bounds = [(int(w), True) for w in windows[windows >= start]]
+    if not bounds or bounds[-1][0] != steps - 1:
+        bounds.append((steps - 1, False))
+
+    seg_start = start
+    for w, is_window in bounds:
+        if w < seg_start:
+            continue
+        n = w - seg_start + 1
+        buf = np.empty((n_res, n + 1))
+        buf[:, 0] = stock
+        buf[:, 1:] = -draw[:, None]
+        np.cumsum(buf, axis=1, out=buf)
+        vals = buf[:, 1:]
+
+        # Depletion before the window step ends the run without consuming a draw.
+        dead = np.flatnonzero((vals[:, :-1] <= 0.0).any(axis=0))
+        if dead.size == 0 and is_window:
+            if checkpoints is not None:
+                cp = (w, buf[:, -2].copy(), imported.copy(), rng.bit_generator.state)
+            u = rng.random()
+            if u >= sc.missed_window_probability:
+                # Imports restore a fraction of what is left; nothing arrives for an empty store.
+                imported += np.maximum(0.0, vals[:, -1]) * table.import_restore_fraction
+                vals[:, -1] *= growth
+            if checkpoints is not None:
+                checkpoints.append(WindowCheckpoint(*cp, u))
+        if dead.size == 0 and (vals[:, -1] <= 0.0).any():
+            dead = np.array([n - 1])
+
+        if dead.size:
+            c = int(dead[0])
+            i = seg_start + c
+            series[:, seg_start:i] = np.maximum(vals[:, :c], 0.0)
+            # clamp remaining
+            series[:, i:] = np.maximum(vals[:, c], 0.0)[:, None]
+            depleted = np.flatnonzero(vals[:, c] <= 0.0)
+            return StockRun(True, float(t_days[i]), table.names[int(depleted[0])], i, vals[:, c].copy(), imported)
+
+        series[:, seg_start:w + 1] = np.maximum(vals, 0.0)
+        stock = vals[:, -1].copy()
+        seg_start = w + 1
+
+    return StockRun(False, None, None, steps - 1, stock, imported)
+
+def _accumulate_dose(sc: Scenario, t_days, last_step: int) -> float:
+    """Radiation dose bookkeeping over steps 0..last_step (the collapse step is still counted)."""
+    if last_step < 0:
+        return 0.0
+    # Cruise dose applied at the beginning for sc.cruise_days
+    per_step = np.where(
+        t_days[:last_step + 1] < sc.cruise_days,
+        RAD_CRUISE_DOSE_EQUIV_MSV_PER_DAY.value * (sc.dt_days / 1.0),
+        RAD_SURFACE_DOSE_EQUIV_MSV_PER_DAY.value * (sc.dt_days / 1.0),
+    )
+    # cumsum adds left to right, i.e. the same rounding as a per-step `dose += rate * dt`.
+    return float(np.cumsum(per_step)[-1])
+
+def simulate(sc: Scenario, seed: int = 123, stocks_out=None):
     """
     Returns:
       dict with time series of resource stocks (in 'days of coverage') and population state (constant here),
       plus collapse time if resources hit zero.
+
+      Every resource r (see "resources"; "o2", "water", then sc.extra_resources) gets
+      "<r>_stock_days", "<r>_imported_days" and "<r>_demand_kg_per_day"; "stock_days" is the
+      (resources x steps) array behind the per-resource series. Collapse is any-resource
+      depletion; "collapse_resource" names the first depleted store (table order).
+
+    stocks_out: optional preallocated float64 array of shape (len(resources), simulate_steps(sc))
+      (e.g. a task's block of a shared memmap slab). When given, the series are written in place
+      and the returned dict references it instead of a fresh array.
     """
     _validate_scenario(sc)
 
     rng = np.random.default_rng(seed)
 
-    steps = int(sc.years * 365.0 / sc.dt_days)
+    steps = simulate_steps(sc)
     t_days = np.arange(steps) * sc.dt_days
-
-    # Convert daily demand (kg/day) for colony size
-    o2_demand_kg_per_day = sc.N0 * O2_KG_PER_CREW_MEMBER_DAY.value
-    water_demand_kg_per_day = sc.N0 * WATER_KG_PER_CREW_MEMBER_DAY_BASELINE.value
+    table = resource_table(sc)
 
     # Represent storage as "days of demand coverage"
-    o2_stock_days = float(sc.o2_storage_days)
-    water_stock_days = float(sc.water_storage_days)
-
-    o2_series = np.zeros(steps)
-    water_series = np.zeros(steps)
-
-    collapsed = False
-    collapse_day = None
+    series = _series_buffer(stocks_out, (len(table.names), steps))
+    run = _run_stocks(sc, table, rng, t_days, 0, table.storage_days, series)
 
     # Radiation dose bookkeeping
-    dose_msv = 0.0
+    dose_msv = _accumulate_dose(sc, t_days, run.last_step)
 
-    for i in range(steps):
-        day = t_days[i]
+    return _assemble_result(sc, table, t_days, series, run, dose_msv)
 
-        # Cruise dose applied at the beginning for sc.cruise_days
-        if day < sc.cruise_days:
-            dose_msv += RAD_CRUISE_DOSE_EQUIV_MSV_PER_DAY.value * (sc.dt_days / 1.0)
-        else:
-            dose_msv += RAD_SURFACE_DOSE_EQUIV_MSV_PER_DAY.value * (sc.dt_days / 1.0)
-
-        # Effective local water closure: local_fraction + recovery contribution.
-        # We treat water_recovery_fraction as a multiplier on the "non-local" portion, conservative:
-        # unmet portion = (1 - local_fraction); recovered portion reduces imports needed, not producing water from nothing.
-        # Here we approximate: net draw from storage per day = (1 - local_fraction) * (1 - recovery_fraction).
-        water_net_draw_fraction = (1.0 - sc.water_local_fraction) * (1.0 - sc.water_recovery_fraction)
-
-        # Oxygen: no general "98% recovery" claim is used here (not verified in our allowed constants set).
-        # Net draw fraction = (1 - o2_local_fraction)
-        o2_net_draw_fraction = (1.0 - sc.o2_local_fraction)
-
-        # Update stocks in "days"
-        o2_stock_days -= o2_net_draw_fraction * (sc.dt_days / 1.0)
-        water_stock_days -= water_net_draw_fraction * (sc.dt_days / 1.0)
-
-        # Launch window imports
-        if sc.launch_window_days > 0 and i > 0 and (int(day) % sc.launch_window_days == 0):
-            if rng.random() >= sc.missed_window_probability:
-                o2_stock_days *= (1.0 + sc.import_restore_fraction_o2)
-                water_stock_days *= (1.0 + sc.import_restore_fraction_water)
-
-        o2_series[i] = max(0.0, o2_stock_days)
-        water_series[i] = max(0.0, water_stock_days)
-
-        if (o2_stock_days <= 0.0) or (water_stock_days <= 0.0):
-            collapsed = True
-            collapse_day = float(day)
-            # clamp remaining
-            o2_series[i:] = max(0.0, o2_stock_days)
-            water_series[i:] = max(0.0, water_stock_days)
-            break
+def _assemble_result(sc: Scenario, table: ResourceTable, t_days, series, run: StockRun, dose_msv: float) -> dict:
+    # Convert daily demand (kg/day) for colony size
+    demand_kg_per_day = sc.N0 * table.demand_kg_per_crew_day
 
-    return {
+    out = {
         "t_days": t_days,
-        "o2_stock_days": o2_series,
-        "water_stock_days": water_series,
-        "collapsed": collapsed,
-        "collapse_day": collapse_day,
+        "resources": table.names,
+        "stock_days": series,
+        "imported_days": run.imported_days,
+        "collapsed": run.collapsed,
+        "collapse_day": run.collapse_day,
+        "collapse_resource": run.collapse_resource,
         "dose_msv_total": dose_msv,
-        "o2_demand_kg_per_day": o2_demand_kg_per_day,
-        "water_demand_kg_per_day": water_demand_kg_per_day,
-    }
+    }
+    for k, name in enumerate(table.names):
+        out[f"{name}_stock_days"] = series[k]
+        out[f"{name}_demand_kg_per_day"] = float(demand_kg_per_day[k])
+        out[f"{name}_imported_days"] = float(run.imported_days[k])
+    return out
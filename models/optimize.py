@@ -0,0 +1,307 @@
+"""
+models/optimize.py
+
+Design optimizer: minimize expected launched consumables mass subject to a collapse-risk cap.
+
+    minimize   E[ launched mass ]  =  sum_r (storage_days_r + imported_days_r) * N0 * c_r
+    subject to P(collapse within `years`) <= risk_target
+
+c_r are the verified per-crew demand constants of every resource in the scenario
+(O2_KG_PER_CREW_MEMBER_DAY, WATER_KG_PER_CREW_MEMBER_DAY_BASELINE, extra resources).
+Hardware mass for local production/recycling is NOT priced (no verified source), so
+local fractions should only be freed within ranges the user can justify.
+
+Method:
+- CMA-ES (Hansen) over the free fields, normalized to [0,1]; each generation is one
+  batch of candidates that can be evaluated in parallel (any concurrent.futures executor).
+- Common random numbers: every candidate is simulated on the same seed set, so candidate
+  comparisons are not swamped by Monte Carlo noise (sample-average approximation).
+- Constraint handling by feasibility-first ranking (feasible by mass, then infeasible by
+  violation). The SAA risk target starts at risk_target / 2 and is tightened (with more
+  CRN seeds) whenever the verification step fails.
+- Verification on an independent seed set: exact one-sided Clopper-Pearson upper bound
+  on P(collapse). A design is certified only if that bound is <= risk_target. Each round
+  verifies on a fresh, disjoint seed block at level 1 - (1 - confidence) / max_rounds
+  (Bonferroni), so stopping at the first certified round keeps the overall `confidence`.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field, replace
+from typing import Callable, Mapping, Sequence
+
+import numpy as np
+
+from .model import Scenario, resource_table, simulate
+
+DESIGN_FIELDS = (
+    "o2_storage_days",
+    "water_storage_days",
+    "o2_local_fraction",
+    "water_local_fraction",
+    "import_restore_fraction_o2",
+    "import_restore_fraction_water",
+)
+
+# Verification seeds never overlap the optimization (CRN) seeds.
+VERIFY_SEED_OFFSET = 1_000_000
+
+@dataclass(frozen=True)
+class RiskEstimate:
+    runs: int
+    collapses: int
+    mean_launched_mass_kg: float
+    # Mean fraction of the horizon lost to collapse; only used to rank infeasible designs.
+    mean_shortfall: float
+
+    @property
+    def collapse_rate(self) -> float:
+        return self.collapses / self.runs
+
+@dataclass(frozen=True)
+class FeasibilityCertificate:
+    runs: int
+    collapses: int
+    p_hat: float
+    p_upper: float
+    confidence: float
+    risk_target: float
+    seed_start: int
+
+    @property
+    def feasible(self) -> bool:
+        return self.p_upper <= self.risk_target
+
+@dataclass(frozen=True)
+class OptimizationResult:
+    scenario: Scenario
+    launched_mass_kg: float
+    certificate: FeasibilityCertificate
+    model_evaluations: int
+    generations: int
+    rounds: int
+    history: list = field(default_factory=list, repr=False)
+
+def launched_mass_kg(sc: Scenario, res: dict) -> float:
+    """Initial storage plus resupply delivered, converted to kg with the verified demand constants."""
+    table = resource_table(sc)
+    days = table.storage_days + res["imported_days"]
+    return float(sc.N0 * np.dot(days, table.demand_kg_per_crew_day))
+
+def evaluate_design(sc: Scenario, seeds: Sequence[int]) -> RiskEstimate:
+    """Monte Carlo estimate for one design. Top-level so it can run in a process pool."""
+    horizon = sc.years * 365.0
+    collapses = 0
+    mass = 0.0
+    shortfall = 0.0
+    for s in seeds:
+        res = simulate(sc, seed=s)
+        mass += launched_mass_kg(sc, res)
+        if res["collapsed"]:
+            collapses += 1
+            shortfall += 1.0 - res["collapse_day"] / horizon
+    n = len(seeds)
+    return RiskEstimate(runs=n, collapses=collapses, mean_launched_mass_kg=mass / n, mean_shortfall=shortfall / n)
+
+def _binom_cdf(k: int, n: int, p: float) -> float:
+    if p <= 0.0:
+        return 1.0
+    if p >= 1.0:
+        return 1.0 if k >= n else 0.0
+    lp, lq = math.log(p), math.log1p(-p)
+    return min(1.0, sum(
+        math.exp(math.lgamma(n + 1) - math.lgamma(i + 1) - math.lgamma(n - i + 1) + i * lp + (n - i) * lq)
+        for i in range(k + 1)
+    ))
+
+def clopper_pearson_upper(k: int, n: int, confidence: float = 0.95) -> float:
+    """Exact one-sided upper confidence bound for a binomial proportion (k successes in n)."""
+    if n <= 0:
+        raise ValueError("n must be >= 1")
+    if k >= n:
+        return 1.0
+    alpha = 1.0 - confidence
+    lo, hi = k / n, 1.0
+    for _ in range(100):
+        mid = 0.5 * (lo + hi)
+        if _binom_cdf(k, n, mid) > alpha:
+            lo = mid
+        else:
+            hi = mid
+    return hi
+
+def certify(sc: Scenario, risk_target: float, runs: int = 2000, confidence: float = 0.95,
+            seed_start: int = VERIFY_SEED_OFFSET) -> tuple[FeasibilityCertificate, RiskEstimate]:
+    est = evaluate_design(sc, range(seed_start, seed_start + runs))
+    cert = FeasibilityCertificate(
+        runs=runs,
+        collapses=est.collapses,
+        p_hat=est.collapse_rate,
+        p_upper=clopper_pearson_upper(est.collapses, runs, confidence),
+        confidence=confidence,
+        risk_target=risk_target,
+        seed_start=seed_start,
+    )
+    return cert, est
+
+class _CMAES:
+    """Minimal (mu/mu_w, lambda)-CMA-ES on the unit box (Hansen, 'The CMA Evolution Strategy: A Tutorial')."""
+
+    def __init__(self, x0: np.ndarray, sigma0: float, rng: np.random.Generator, popsize: int = 0) -> None:
+        n = len(x0)
+        self.n = n
+        self.rng = rng
+        self.lam = popsize if popsize > 0 else 4 + int(3 * math.log(n))
+        self.mu = self.lam // 2
+        w = math.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.w = w / w.sum()
+        self.mueff = 1.0 / float(np.sum(self.w ** 2))
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2) ** 2 + self.mueff))
+        self.damps = 1 + 2 * max(0.0, math.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+        self.chin = math.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n * n))
+        self.m = np.array(x0, dtype=float)
+        self.sigma = sigma0
+        self.C = np.eye(n)
+        self.pc = np.zeros(n)
+        self.ps = np.zeros(n)
+        self.gen = 0
+
+    def ask(self) -> np.ndarray:
+        d2, B = np.linalg.eigh(self.C)
+        self._B, self._D = B, np.sqrt(np.maximum(d2, 1e-20))
+        z = self.rng.standard_normal((self.lam, self.n))
+        x = self.m + self.sigma * (z * self._D) @ B.T
+        # Box repair: the clipped point is both evaluated and used in the update.
+        return np.clip(x, 0.0, 1.0)
+
+    def tell(self, x: np.ndarray, order: np.ndarray) -> None:
+        self.gen += 1
+        sel = x[order[:self.mu]]
+        m_old = self.m
+        self.m = self.w @ sel
+        y_w = (self.m - m_old) / self.sigma
+        c_inv_sqrt = self._B @ np.diag(1.0 / self._D) @ self._B.T
+        self.ps = (1 - self.cs) * self.ps + math.sqrt(self.cs * (2 - self.cs) * self.mueff) * (c_inv_sqrt @ y_w)
+        hsig = (np.linalg.norm(self.ps) / math.sqrt(1 - (1 - self.cs) ** (2 * self.gen)) / self.chin
+                < 1.4 + 2 / (self.n + 1))
+        self.pc = (1 - self.cc) * self.pc + hsig * math.sqrt(self.cc * (2 - self.cc) * self.mueff) * y_w
+        art = (sel - m_old) / self.sigma
+        self.C = ((1 - self.c1 - self.cmu) * self.C
+                  + self.c1 * (np.outer(self.pc, self.pc) + (1 - hsig) * self.cc * (2 - self.cc) * self.C)
+                  + self.cmu * (art.T * self.w) @ art)
+        self.C = 0.5 * (self.C + self.C.T)
+        self.sigma *= math.exp((self.cs / self.damps) * (np.linalg.norm(self.ps) / self.chin - 1))
+
+    @property
+    def spread(self) -> float:
+        return self.sigma * float(np.sqrt(np.max(np.diag(self.C))))
+
+def _rank_key(est: RiskEstimate, saa_target: float) -> tuple:
+    violation = max(0.0, est.collapse_rate - saa_target)
+    if violation > 0.0:
+        return (1, violation + est.mean_shortfall, est.mean_launched_mass_kg)
+    return (0, 0.0, est.mean_launched_mass_kg)
+
+def optimize_design(
+    base: Scenario,
+    bounds: Mapping[str, tuple[float, float]],
+    risk_target: float,
+    crn_runs: int = 64,
+    popsize: int = 0,
+    max_generations: int = 40,
+    tol: float = 1e-3,
+    verify_runs: int = 2000,
+    confidence: float = 0.95,
+    max_rounds: int = 4,
+    seed: int = 0,
+    map_fn: Callable | None = None,
+) -> OptimizationResult:
+    """
+    bounds: {field: (lo, hi)} for the free subset of DESIGN_FIELDS; other fields come from `base`.
+    map_fn: batch evaluator with the signature of builtins.map (e.g. ProcessPoolExecutor.map);
+            defaults to serial map.
+    """
+    if not (0.0 < risk_target < 1.0):
+        raise ValueError("risk_target must be in (0,1)")
+    if not bounds:
+        raise ValueError("bounds must free at least one design field")
+    for name, (lo, hi) in bounds.items():
+        if name not in DESIGN_FIELDS:
+            raise ValueError(f"{name} is not a design field; allowed: {DESIGN_FIELDS}")
+        if not lo < hi:
+            raise ValueError(f"bounds for {name} must satisfy lo < hi")
+    crn_end = seed + crn_runs * 2 ** (max_rounds - 1)
+    verify_end = VERIFY_SEED_OFFSET + max_rounds * verify_runs
+    if seed < verify_end and VERIFY_SEED_OFFSET < crn_end:
+        raise ValueError(
+            f"CRN seeds [{seed}, {crn_end}) overlap the verification seeds [{VERIFY_SEED_OFFSET}, {verify_end})"
+        )
+    # Up to max_rounds verification tests: split alpha so the certificate holds overall.
+    round_confidence = 1.0 - (1.0 - confidence) / max_rounds
+    names = list(bounds)
+    lo = np.array([bounds[n][0] for n in names], dtype=float)
+    hi = np.array([bounds[n][1] for n in names], dtype=float)
+    mapper = map_fn if map_fn is not None else map
+
+    def to_scenario(u: np.ndarray) -> Scenario:
+        x = lo + u * (hi - lo)
+        return replace(base, **{n: float(v) for n, v in zip(names, x)})
+
+    rng = np.random.default_rng(seed)
+    x0 = np.full(len(names), 0.5)
+    for k, n in enumerate(names):
+        v = getattr(base, n)
+        if lo[k] <= v <= hi[k]:
+            x0[k] = (v - lo[k]) / (hi[k] - lo[k])
+
+    evaluations = 0
+    generations = 0
+    history: list = []
+    saa_target = risk_target / 2
+    n_crn = crn_runs
+    best_u = x0
+    cert = None
+
+    for rnd in range(1, max_rounds + 1):
+        seeds = list(range(seed, seed + n_crn))
+        es = _CMAES(best_u, 0.3, rng, popsize)
+        best = None
+        for _ in range(max_generations):
+            U = es.ask()
+            scs = [to_scenario(u) for u in U]
+            ests = list(mapper(evaluate_design, scs, [seeds] * len(scs)))
+            evaluations += len(scs) * n_crn
+            keys = [_rank_key(e, saa_target) for e in ests]
+            order = np.array(sorted(range(len(keys)), key=keys.__getitem__))
+            es.tell(U, order)
+            generations += 1
+            i0 = int(order[0])
+            if best is None or keys[i0] < best[0]:
+                best = (keys[i0], U[i0].copy(), ests[i0])
+            history.append((rnd, generations, best[2].mean_launched_mass_kg, best[2].collapse_rate))
+            if es.spread < tol:
+                break
+
+        best_u = best[1]
+        cert, est = certify(to_scenario(best_u), risk_target, verify_runs, round_confidence,
+                            seed_start=VERIFY_SEED_OFFSET + (rnd - 1) * verify_runs)
+        evaluations += verify_runs
+        if cert.feasible:
+            break
+        # Verification failed: tighten the SAA constraint and reduce its noise.
+        saa_target /= 2
+        n_crn *= 2
+
+    return OptimizationResult(
+        scenario=to_scenario(best_u),
+        launched_mass_kg=est.mean_launched_mass_kg,
+        certificate=cert,
+        model_evaluations=evaluations,
+        generations=generations,
+        rounds=rnd,
+        history=history,
+    )
@@ -9,6 +9,7 @@ simulation must refuse to run until it becomes verified.
 """
 
 from dataclasses import dataclass
+import hashlib
 
 @dataclass(frozen=True)
 class VerifiedConstant:
@@ -103,4 +104,23 @@ WATER_KG_PER_CREW_MEMBER_DAY_BASELINE = VerifiedConstant(
     publisher="NASA (NTRS)",
     date="2023",
     url="https://ntrs.nasa.gov/api/citations/20230013555/downloads/Take%20or%20Make%20in%20space.pdf",
-)
+)
+
+def registered_constants() -> dict[str, VerifiedConstant]:
+    """Every VerifiedConstant defined in this module, by name."""
+    return {v.name: v for v in globals().values() if isinstance(v, VerifiedConstant)}
+
+def is_registered(c: object) -> bool:
+    """True only for a constant defined here (a look-alike built elsewhere does not count)."""
+    return isinstance(c, VerifiedConstant) and registered_constants().get(c.name) == c
+
+def constants_hash() -> str:
+    """
+    SHA-256 over every VerifiedConstant in this module (name, value, units), sorted by name.
+    Stored with each run so results can be matched to the constants set that produced them.
+    """
+    items = sorted(
+        (v.name, repr(float(v.value)), v.units)
+        for v in registered_constants().values()
+    )
+    return hashlib.sha256("\n".join("|".join(i) for i in items).encode("utf-8")).hexdigest()
@@ -0,0 +1,329 @@
+"""
+scripts/catalog.py
+
+Indexed SQLite catalog of scenario runs.
+
+One row per run: every scalar Scenario field as its own column, extra resources as JSON,
+seed, engine version, verified-constants hash and summary metrics. The commonly filtered
+parameters are indexed (composite indexes lead with `collapsed` for the usual
+"collapsed runs in this parameter range" queries), so range queries do not scan result files.
+
+A run is identified by (scenario_id, seed, engine_version, constants_hash, scenario
+parameters); re-ingesting the same run is a no-op.
+
+API:
+    cat = ResultsCatalog("results/catalog.sqlite")
+    cat.add_runs(rows)                                   # bulk insert (one transaction)
+    with cat.bulk(): ...                                 # many add_runs, indexes rebuilt once
+    cat.query("N0>=10", "N0<=50", "o2_local_fraction>0.98", "collapsed=1")
+
+CLI:
+    python -m scripts.catalog ingest  [--db PATH] [results/S*.json ...]
+    python -m scripts.catalog query   [--db PATH] --where "N0>=10" --where "collapsed=1" [--count] [--limit N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import json
+import re
+import sqlite3
+import sys
+from dataclasses import asdict, fields
+from pathlib import Path
+from typing import Iterable, Mapping, Sequence
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from models.model import ENGINE_VERSION, ResourceSpec, Scenario  # noqa: E402
+from models.verified_constants import VerifiedConstant, constants_hash  # noqa: E402
+
+DEFAULT_DB = REPO_ROOT / "results" / "catalog.sqlite"
+CONSTANTS_HASH = constants_hash()
+
+_SQL_TYPES = {int: "INTEGER", float: "REAL", "int": "INTEGER", "float": "REAL"}
+
+def _scenario_columns() -> list[tuple[str, str]]:
+    cols = []
+    for f in fields(Scenario):
+        if f.name == "extra_resources":
+            continue
+        cols.append((f.name, _SQL_TYPES.get(f.type, "REAL")))
+    return cols
+
+RUN_COLUMNS: list[tuple[str, str]] = [
+    ("scenario_id", "TEXT"),
+    ("seed", "INTEGER"),
+    ("engine_version", "TEXT"),
+    ("constants_hash", "TEXT"),
+    # Short digest of all scenario parameters (see params_hash()); part of the run key.
+    ("params_hash", "TEXT"),
+    *_scenario_columns(),
+    ("extra_resources", "TEXT"),
+    ("collapsed", "INTEGER"),
+    ("collapse_day", "REAL"),
+    ("collapse_resource", "TEXT"),
+    ("dose_msv", "REAL"),
+    ("o2_min_stock_days", "REAL"),
+    ("water_min_stock_days", "REAL"),
+    # Remaining per-run metrics (e.g. extra-resource minima) as JSON.
+    ("metrics", "TEXT"),
+]
+COLUMN_NAMES = [c for c, _ in RUN_COLUMNS]
+
+# index name -> columns. `collapsed` matches a large share of rows, so it never leads an
+# index: it is the second column of each per-parameter index, where "collapsed runs in
+# parameter range X" is answered from X's index without row lookups.
+INDEXED_PARAMETERS = [
+    "years",
+    "o2_storage_days",
+    "water_storage_days",
+    "o2_local_fraction",
+    "water_local_fraction",
+    "missed_window_probability",
+    "collapse_day",
+]
+INDEXES: dict[str, tuple[str, ...]] = {
+    "scenario_id": ("scenario_id", "collapsed"),
+    **{c: (c, "collapsed") for c in INDEXED_PARAMETERS},
+    # Covers the common "N0 range x closure fraction x collapsed" query without row lookups.
+    "N0": ("N0", "collapsed", "o2_local_fraction", "water_local_fraction"),
+}
+
+# Columns identifying a run (NULL seed compares equal via IFNULL).
+RUN_KEY = ["scenario_id", "seed", "engine_version", "constants_hash", "params_hash"]
+_NULLABLE_KEY = {"seed": "-1"}
+
+# Rows sampled per index by ANALYZE; keeps the post-load ANALYZE cheap on large catalogs.
+ANALYSIS_LIMIT = 1000
+CACHE_KIB = 256 * 1024
+
+_CONDITION = re.compile(r"^\s*([A-Za-z_][A-Za-z0-9_]*)\s*(<=|>=|!=|=|<|>)\s*(.+?)\s*$")
+
+def _q(col: str) -> str:
+    return f'"{col}"'
+
+def parse_condition(text: str) -> tuple[str, str, object]:
+    """'N0>=10' -> ('N0', '>=', 10). Column names are checked against the schema."""
+    m = _CONDITION.match(text)
+    if not m:
+        raise ValueError(f"Cannot parse condition {text!r}; expected e.g. 'N0>=10'")
+    col, op, raw = m.groups()
+    if col not in COLUMN_NAMES:
+        raise ValueError(f"Unknown column {col!r}")
+    value: object = raw
+    for conv in (int, float):
+        try:
+            value = conv(raw)
+            break
+        except ValueError:
+            pass
+    if raw.lower() in ("true", "false"):
+        value = int(raw.lower() == "true")
+    return col, op, value
+
+def _canonical(v: object) -> object:
+    # 365 and 365.0 are the same parameter value.
+    if isinstance(v, bool) or v is None or isinstance(v, str):
+        return v
+    if isinstance(v, (int, float)):
+        return float(v)
+    if isinstance(v, dict):
+        return {k: _canonical(x) for k, x in v.items()}
+    if isinstance(v, (list, tuple)):
+        return [_canonical(x) for x in v]
+    return v
+
+def params_hash(sc: Scenario) -> str:
+    """16-hex-digit digest of every Scenario field, including extra_resources."""
+    text = json.dumps(_canonical(asdict(sc)), sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+def catalog_row(scenario_id: str, sc: Scenario, seed: int | None, metrics: Mapping[str, object]) -> dict:
+    """Row for add_runs(); `metrics` uses run_scenarios' keys (collapsed, dose_msv, *_min_stock_days, ...)."""
+    row = {k: v for k, v in asdict(sc).items() if k != "extra_resources"}
+    row["extra_resources"] = json.dumps(asdict(sc)["extra_resources"]) if sc.extra_resources else None
+    row["scenario_id"] = scenario_id
+    row["seed"] = seed
+    row["engine_version"] = ENGINE_VERSION
+    row["constants_hash"] = CONSTANTS_HASH
+    row["params_hash"] = params_hash(sc)
+    rest = {}
+    for k, v in metrics.items():
+        if k in COLUMN_NAMES:
+            row[k] = int(v) if isinstance(v, bool) else v
+        else:
+            rest[k] = v
+    row["metrics"] = json.dumps(rest) if rest else None
+    return row
+
+class ResultsCatalog:
+    def __init__(self, path: Path | str = DEFAULT_DB) -> None:
+        self.path = str(path)
+        # Writers may live on a pipeline I/O thread; callers keep access single-threaded.
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._bulk = False
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+        # Index pages of a large catalog stay cached across bulk inserts (KiB, negative = size).
+        self.conn.execute(f"PRAGMA cache_size=-{CACHE_KIB}")
+        self._create()
+
+    def _create(self) -> None:
+        cols = ", ".join(f"{_q(c)} {t}" for c, t in RUN_COLUMNS)
+        with self.conn:
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS runs (run_id INTEGER PRIMARY KEY, {cols})")
+            have = {r[1] for r in self.conn.execute("PRAGMA table_info(runs)")}
+            if "params_hash" not in have:
+                raise RuntimeError(f"{self.path} predates the params_hash run key; ingest into a new catalog")
+            key = ", ".join(
+                f"IFNULL({_q(c)}, {_NULLABLE_KEY[c]})" if c in _NULLABLE_KEY else _q(c) for c in RUN_KEY
+            )
+            self.conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_runs_key ON runs({key})")
+        self._create_indexes()
+
+    def _create_indexes(self) -> None:
+        with self.conn:
+            for name, cols in INDEXES.items():
+                self.conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_runs_{name} ON runs({', '.join(_q(c) for c in cols)})"
+                )
+
+    @contextlib.contextmanager
+    def bulk(self):
+        """
+        Large loads: drop the query indexes, insert, rebuild them once (sorted build, far
+        cheaper than updating every index per row). Deduplication stays active.
+        """
+        self._bulk = True
+        with self.conn:
+            for name in INDEXES:
+                self.conn.execute(f"DROP INDEX IF EXISTS idx_runs_{name}")
+        try:
+            yield self
+        finally:
+            self._bulk = False
+            self._create_indexes()
+            self.analyze()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "ResultsCatalog":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def add_runs(self, rows: Iterable[Mapping[str, object]]) -> int:
+        """
+        Bulk insert in a single transaction, then refresh planner statistics.
+        Runs already in the catalog are skipped. Returns the number of new rows.
+        """
+        placeholders = ", ".join("?" for _ in COLUMN_NAMES)
+        sql = f"INSERT OR IGNORE INTO runs ({', '.join(_q(c) for c in COLUMN_NAMES)}) VALUES ({placeholders})"
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(sql, (tuple(r.get(c) for c in COLUMN_NAMES) for r in rows))
+            n = self.conn.total_changes - before
+        if n and not self._bulk:
+            self.analyze()
+        return n
+
+    def analyze(self) -> None:
+        # Without statistics SQLite may pick the low-selectivity index for range queries.
+        self.conn.execute("ANALYZE")
+        self.conn.commit()
+
+    def _where(self, conditions: Sequence[str | tuple]) -> tuple[str, list]:
+        clauses, params = [], []
+        for c in conditions:
+            col, op, value = parse_condition(c) if isinstance(c, str) else c
+            if col not in COLUMN_NAMES:
+                raise ValueError(f"Unknown column {col!r}")
+            if op not in ("=", "!=", "<", "<=", ">", ">="):
+                raise ValueError(f"Unsupported operator {op!r}")
+            clauses.append(f"{_q(col)} {op} ?")
+            params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, *conditions: str | tuple, columns: Sequence[str] | None = None,
+              limit: int | None = None, order_by: str | None = None) -> list[dict]:
+        """
+        Rows matching all conditions ('N0>=10' strings or (column, op, value) tuples).
+        """
+        cols = list(columns) if columns else ["run_id", *COLUMN_NAMES]
+        for c in cols:
+            if c != "run_id" and c not in COLUMN_NAMES:
+                raise ValueError(f"Unknown column {c!r}")
+        where, params = self._where(conditions)
+        sql = f"SELECT {', '.join(_q(c) for c in cols)} FROM runs{where}"
+        if order_by:
+            if order_by not in COLUMN_NAMES and order_by != "run_id":
+                raise ValueError(f"Unknown column {order_by!r}")
+            sql += f" ORDER BY {_q(order_by)}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        cur = self.conn.execute(sql, params)
+        return [dict(zip(cols, r)) for r in cur.fetchall()]
+
+    def count(self, *conditions: str | tuple) -> int:
+        where, params = self._where(conditions)
+        return int(self.conn.execute(f"SELECT COUNT(*) FROM runs{where}", params).fetchone()[0])
+
+def _artifact_row(path: Path) -> dict:
+    # Per-scenario JSON artifacts written by run_scenarios (older ones have no seed).
+    obj = json.loads(path.read_text(encoding="utf-8"))
+    kw = dict(obj["scenario"])
+    kw["extra_resources"] = tuple(
+        ResourceSpec(**{**r, "demand": VerifiedConstant(**r["demand"])})
+        for r in kw.get("extra_resources", ())
+    )
+    sc = Scenario(**kw)
+    return catalog_row(obj["scenario_id"], sc, obj.get("seed"), obj.get("result_summary", {}))
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser("catalog")
+    ap.add_argument("--db", type=str, default=str(DEFAULT_DB))
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    ing = sub.add_parser("ingest", help="Add run_scenarios JSON artifacts to the catalog.")
+    ing.add_argument("paths", nargs="*", help="Artifact files (default: results/S*.json).")
+
+    q = sub.add_parser("query", help="Select runs by parameter ranges.")
+    q.add_argument("--where", action="append", default=[], help="Condition like 'N0>=10' (repeatable, ANDed).")
+    q.add_argument("--columns", type=str, default="", help="Comma-separated output columns.")
+    q.add_argument("--limit", type=int, default=None)
+    q.add_argument("--count", action="store_true", help="Only print the number of matching runs.")
+    a = ap.parse_args(argv)
+
+    with ResultsCatalog(a.db) as cat:
+        if a.cmd == "ingest":
+            paths = [Path(p) for p in a.paths] or sorted((REPO_ROOT / "results").glob("S*.json"))
+            with cat.bulk():
+                n = cat.add_runs(_artifact_row(p) for p in paths)
+            print(f"[catalog] ingested {n} new run(s) into {a.db}")
+            return 0
+
+        if a.count:
+            print(cat.count(*a.where))
+            return 0
+        cols = [c.strip() for c in a.columns.split(",") if c.strip()] or None
+        rows = cat.query(*a.where, columns=cols, limit=a.limit)
+        if not rows:
+            print("[catalog] no matching runs")
+            return 0
+        keys = list(rows[0].keys())
+        print(",".join(keys))
+        for r in rows:
+            print(",".join("" if r[k] is None else str(r[k]) for k in keys))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
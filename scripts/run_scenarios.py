@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import argparse
+import asyncio
+import contextlib
 import csv
 import json
 import os
+import shutil
 import sys
+import tempfile
 from dataclasses import asdict, fields
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
 # --- Robust import: force repo root on sys.path (works for -m and direct run) ---
@@ -12,10 +18,33 @@ REPO_ROOT = Path(__file__).resolve().parents[1]
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
-from models.model import Scenario, simulate  # noqa: E402
+from models.model import Scenario, resource_table  # noqa: E402
+from scripts.catalog import ResultsCatalog, catalog_row  # noqa: E402
+from scripts.summary_stream import SummaryAggregator  # noqa: E402
+from scripts.sweep import (  # noqa: E402
+    SlabSpec,
+    SweepTask,
+    TrajectoryRef,
+    check_task_ids,
+    chunked,
+    create_slab,
+    default_chunk_size,
+    max_resources,
+    max_steps,
+    n_slots,
+    open_slab,
+    release_slab,
+    remove_slab,
+    run_chunk,
+    trajectory,
+)
 
-def _ensure_results_dir() -> Path:
-    out = REPO_ROOT / "results"
+# Per-resource metrics of extra resources are appended by the aggregator as they appear.
+DISTRIBUTION_METRICS = ["collapse_day", "dose_msv", "o2_min_stock_days", "water_min_stock_days"]
+RESOURCE_LABELS = {"o2": "O2", "water": "Water"}
+
+def _ensure_results_dir(path: str = "") -> Path:
+    out = Path(path) if path else REPO_ROOT / "results"
     out.mkdir(parents=True, exist_ok=True)
     return out
 
@@ -34,10 +63,12 @@ def _extract_result(result) -> dict:
     if isinstance(result, dict):
         collapsed = result.get("collapsed", result.get("Collapsed", None))
         collapse_day = result.get("collapse_day", result.get("day_of_collapse", None))
-        o2_series = result.get("o2_series", result.get("o2_stock_days_series", None))
-        water_series = result.get("water_series", result.get("water_stock_days_series", None))
+        o2_series = result.get("o2_series", result.get("o2_stock_days_series", result.get("o2_stock_days", None)))
+        water_series = result.get("water_series", result.get("water_stock_days_series", result.get("water_stock_days", None)))
         t_days = result.get("t_days", result.get("time_days", None))
-        dose_msv = result.get("dose_msv", result.get("radiation_dose_msv", None))
+        dose_msv = result.get("dose_msv", result.get("radiation_dose_msv", result.get("dose_msv_total", None)))
+        collapse_resource = result.get("collapse_resource", None)
+        series = {name: result[f"{name}_stock_days"] for name in result.get("resources", ())}
     else:
         collapsed = getattr(result, "collapsed", getattr(result, "Collapsed", None))
         collapse_day = getattr(result, "collapse_day", getattr(result, "day_of_collapse", None))
@@ -45,39 +76,121 @@ def _extract_result(result) -> dict:
         water_series = getattr(result, "water_series", None)
         t_days = getattr(result, "t_days", None)
         dose_msv = getattr(result, "dose_msv", None)
+        collapse_resource = getattr(result, "collapse_resource", None)
+        series = {}
+
+    if not series:
+        series = {k: v for k, v in (("o2", o2_series), ("water", water_series)) if v is not None}
 
     return {
         "collapsed": collapsed,
         "collapse_day": collapse_day,
+        "collapse_resource": collapse_resource,
         "t_days": t_days,
         "o2_series": o2_series,
         "water_series": water_series,
+        "series": series,
         "dose_msv": dose_msv,
     }
 
+def _ref_result(slab, ref) -> dict:
+    # Same shape as _extract_result(), but series are views into the sweep slab.
+    tr = trajectory(slab, ref)
+    return {
+        "collapsed": ref.collapsed,
+        "collapse_day": ref.collapse_day,
+        "collapse_resource": ref.collapse_resource,
+        "t_days": tr["t_days"],
+        "o2_series": tr["o2_stock_days"],
+        "water_series": tr["water_stock_days"],
+        "series": {name: tr[f"{name}_stock_days"] for name in ref.resources},
+        "dose_msv": ref.dose_msv,
+    }
+
+def _distribution_metrics(ref: TrajectoryRef) -> dict:
+    # Minima come with the ref: replicates beyond 0 have no series in the slab.
+    m = {
+        "collapse_day": ref.collapse_day,
+        "dose_msv": ref.dose_msv,
+    }
+    for name, v in zip(ref.resources, ref.min_stock_days):
+        m[f"{name}_min_stock_days"] = v
+    return m
+
+# matplotlib is imported once per process (the plot stage may be a worker process).
+_MPL = None
+
+def _mpl():
+    global _MPL
+    if _MPL is None:
+        import matplotlib
+        matplotlib.use("Agg")
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        _MPL = (Figure, FigureCanvasAgg)
+    return _MPL
+
 def _plot_series(path: Path, x, y, title: str, xlabel: str, ylabel: str) -> None:
-    import matplotlib
-    matplotlib.use("Agg")
-    import matplotlib.pyplot as plt  # noqa: E402
-
-    plt.figure()
-    plt.plot(x, y)
-    plt.title(title)
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    plt.grid(True, alpha=0.25)
-    plt.tight_layout()
-    plt.savefig(path, dpi=160)
-    plt.close()
+    # Object-oriented API: no pyplot global state, so this is safe off the main thread.
+    Figure, FigureCanvas = _mpl()
+    fig = Figure()
+    FigureCanvas(fig)
+    ax = fig.add_subplot(111)
+    ax.plot(x, y)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(True, alpha=0.25)
+    fig.tight_layout()
+    fig.savefig(path, dpi=160)
+
+def _plot_task(spec: SlabSpec, ref: TrajectoryRef, sid: str, out_dir: str) -> None:
+    # Render stage: reads the slab directly, only the descriptor crosses the process boundary.
+    out = Path(out_dir)
+    r = _ref_result(open_slab(spec), ref)
+    for name, series in r["series"].items():
+        label = RESOURCE_LABELS.get(name, name)
+        _plot_series(out / f"{sid}_{name}.png", r["t_days"], series,
+                     f"{sid}: {label} stock (days of coverage)", "Day", f"{label} stock (days)")
+
+# Per-resource parameter columns, grouped by parameter. O2/water keep their Scenario field
+# names (O2 has no recovery field); extra resources use "<name>_<parameter>".
+_BUILTIN_RESOURCE_COLUMNS = {
+    ("o2", "recovery_fraction"): None,
+    ("o2", "import_restore_fraction"): "import_restore_fraction_o2",
+    ("water", "import_restore_fraction"): "import_restore_fraction_water",
+}
+
+def _resource_column(name: str, param: str) -> str | None:
+    return _BUILTIN_RESOURCE_COLUMNS.get((name, param), f"{name}_{param}")
+
+def _resource_columns(rows: list[dict], params: list[str]) -> dict[str, list[str]]:
+    names: list[str] = []
+    for r in rows:
+        names += [n for n in r["resources"] if n not in names]
+    return {p: [c for c in (_resource_column(n, p) for n in names) if c] for p in params}
+
+def _summary_row(sid: str, sc: Scenario, r: dict) -> dict:
+    row = {"scenario_id": sid, **{k: v for k, v in asdict(sc).items() if k != "extra_resources"}}
+    row["resources"] = tuple(resource_table(sc).names)
+    for res in sc.extra_resources:
+        for p in ("storage_days", "local_fraction", "recovery_fraction", "import_restore_fraction"):
+            row[_resource_column(res.name, p)] = getattr(res, p)
+    row["collapsed"] = r["collapsed"]
+    row["collapse_day"] = r["collapse_day"]
+    row["collapse_resource"] = r["collapse_resource"]
+    row["dose_msv"] = r["dose_msv"]
+    return row
 
 def _write_summary_csv(path: Path, rows: list[dict]) -> None:
     if not rows:
         raise RuntimeError("No rows to write.")
-    cols = ["scenario_id","N0","years","dt_days","o2_storage_days","water_storage_days",
-            "o2_local_fraction","water_local_fraction","water_recovery_fraction",
+    rc = _resource_columns(rows, ["storage_days", "local_fraction", "recovery_fraction", "import_restore_fraction"])
+    cols = ["scenario_id","N0","years","dt_days",*rc["storage_days"],
+            *rc["local_fraction"],*rc["recovery_fraction"],
             "launch_window_days","missed_window_probability",
-            "import_restore_fraction_o2","import_restore_fraction_water","cruise_days",
-            "collapsed","collapse_day","dose_msv"]
+            *rc["import_restore_fraction"],"cruise_days",
+            "collapsed","collapse_day","collapse_resource","dose_msv"]
     with path.open("w", newline="", encoding="utf-8") as f:
         w = csv.DictWriter(f, fieldnames=cols)
         w.writeheader()
@@ -85,9 +198,10 @@ def _write_summary_csv(path: Path, rows: list[dict]) -> None:
             w.writerow({k: r.get(k, "") for k in cols})
 
 def _write_summary_md(path: Path, rows: list[dict]) -> None:
-    cols = ["scenario_id","N0","o2_storage_days","water_storage_days","o2_local_fraction",
-            "water_local_fraction","water_recovery_fraction","launch_window_days",
-            "missed_window_probability","collapsed","collapse_day","dose_msv"]
+    rc = _resource_columns(rows, ["storage_days", "local_fraction", "recovery_fraction"])
+    cols = ["scenario_id","N0",*rc["storage_days"],*rc["local_fraction"],
+            *rc["recovery_fraction"],"launch_window_days",
+            "missed_window_probability","collapsed","collapse_day","collapse_resource","dose_msv"]
     lines = []
     lines.append("| " + " | ".join(cols) + " |")
     lines.append("| " + " | ".join(["---"]*len(cols)) + " |")
@@ -101,8 +215,141 @@ def _write_summary_md(path: Path, rows: list[dict]) -> None:
         lines.append("| " + " | ".join(vals) + " |")
     path.write_text("\n".join(lines) + "\n", encoding="utf-8")
 
-def main() -> int:
-    out = _ensure_results_dir()
+def _write_chunk(slab, refs: list[TrajectoryRef], scs, replicates: int, base_seed: int, out: Path,
+                 agg: SummaryAggregator, catalog: ResultsCatalog | None = None) -> list[tuple[dict, TrajectoryRef, str]]:
+    """I/O stage (single thread): aggregate/catalog every run, write artifacts for replicate 0."""
+    written = []
+    cat_rows = []
+    for ref in refs:
+        sid, sc = scs[ref.task_id // replicates]
+        metrics = _distribution_metrics(ref)
+        agg.add(sid, bool(ref.collapsed), metrics)
+        if catalog is not None:
+            cat_rows.append(catalog_row(sid, sc, base_seed + ref.task_id % replicates, {
+                **metrics, "collapsed": ref.collapsed, "collapse_resource": ref.collapse_resource,
+            }))
+        if ref.slot is None:
+            # Remaining replicates only feed the bounded-memory aggregator.
+            continue
+        r = _ref_result(slab, ref)
+
+        # Save JSON artifact
+        art = {
+            "scenario_id": sid,
+            "seed": base_seed + ref.task_id % replicates,
+            "scenario": asdict(sc),
+            "result_summary": {
+                "collapsed": r["collapsed"],
+                "collapse_day": r["collapse_day"],
+                "collapse_resource": r["collapse_resource"],
+                "dose_msv": r["dose_msv"],
+            },
+        }
+        (out / f"{sid}.json").write_text(json.dumps(art, indent=2), encoding="utf-8")
+
+        written.append((_summary_row(sid, sc, r), ref, sid))
+    if cat_rows:
+        catalog.add_runs(cat_rows)
+    return written
+
+async def _pipeline(a: argparse.Namespace, scs, tasks: list[SweepTask], spec: SlabSpec,
+                    out: Path, agg: SummaryAggregator, catalog: ResultsCatalog | None = None) -> list[dict]:
+    """
+    compute -> [bounded queue] -> write -> [bounded queue] -> plot
+
+    Each stage runs on its own executor, so simulation, disk writes and PNG rendering
+    overlap; a full queue makes the upstream stage wait (backpressure). Chunks are
+    consumed in submission order, so rows and artifacts come out in scenario order.
+    """
+    loop = asyncio.get_running_loop()
+    chunk_size = a.chunk_size if a.chunk_size > 0 else default_chunk_size(len(tasks), a.workers)
+    compute_q: asyncio.Queue = asyncio.Queue(maxsize=a.queue_size)
+    plot_q: asyncio.Queue = asyncio.Queue(maxsize=a.queue_size)
+    rows: list[dict] = []
+
+    compute_ex = ProcessPoolExecutor(a.workers) if a.workers > 1 else ThreadPoolExecutor(1)
+    io_ex = ThreadPoolExecutor(1)
+    plot_ex = None if a.no_plots else ProcessPoolExecutor(max(1, a.plot_workers))
+
+    async def compute() -> None:
+        for chunk in chunked(tasks, chunk_size):
+            await compute_q.put(loop.run_in_executor(compute_ex, run_chunk, spec, chunk))
+        await compute_q.put(None)
+
+    async def write() -> None:
+        slab = open_slab(spec)
+        while (fut := await compute_q.get()) is not None:
+            refs = await fut
+            written = await loop.run_in_executor(io_ex, _write_chunk, slab, refs, scs, a.replicates, a.seed,
+                                                 out, agg, catalog)
+            for row, ref, sid in written:
+                rows.append(row)
+                if plot_ex is not None:
+                    await plot_q.put((ref, sid))
+        await plot_q.put(None)
+
+    async def plot() -> None:
+        pending: set = set()
+        while (job := await plot_q.get()) is not None:
+            ref, sid = job
+            pending.add(loop.run_in_executor(plot_ex, _plot_task, spec, ref, sid, str(out)))
+            if len(pending) >= a.queue_size:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for d in done:
+                    d.result()
+        if pending:
+            await asyncio.gather(*pending)
+
+    try:
+        await asyncio.gather(compute(), write(), plot())
+    finally:
+        for ex in (compute_ex, io_ex, plot_ex):
+            if ex is not None:
+                ex.shutdown(wait=True, cancel_futures=True)
+    return rows
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser("run_scenarios")
+    ap.add_argument("--seed", type=int, default=123,
+                    help="Base seed; replicate r uses seed + r (replicate 0 drives the per-scenario artifacts).")
+    ap.add_argument("--replicates", type=int, default=1,
+                    help="Monte Carlo replicates per scenario. >1 also writes summary_distribution.csv/.md.")
+    ap.add_argument("--flush-every", type=int, default=1000,
+                    help="Rewrite the partial distribution summary every N runs (0 = only at the end).")
+    ap.add_argument("--sketch-k", type=int, default=200,
+                    help="KLL sketch size per metric (memory/accuracy trade-off).")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Sweep worker processes (1 = in-process).")
+    ap.add_argument("--slab", type=str, default="",
+                    help="Keep the trajectory memmap slab at this path (default: temp file, removed at exit).")
+    ap.add_argument("--chunk-size", type=int, default=0,
+                    help="Tasks per compute chunk (0 = a few chunks per worker).")
+    ap.add_argument("--queue-size", type=int, default=4,
+                    help="Max chunks/plots in flight between pipeline stages (backpressure).")
+    ap.add_argument("--plot-workers", type=int, default=1,
+                    help="Processes rendering PNGs.")
+    ap.add_argument("--no-plots", action="store_true",
+                    help="Skip the PNG rendering stage.")
+    ap.add_argument("--results-dir", type=str, default="",
+                    help="Output directory (default: results/ in the repo).")
+    ap.add_argument("--catalog", type=str, default="",
+                    help="Also bulk-insert every run into this SQLite results catalog (see scripts/catalog.py).")
+    return ap.parse_args(argv)
+
+def main(argv: list[str] | None = None) -> int:
+    a = parse_args(argv)
+    if a.replicates < 1:
+        raise SystemExit("--replicates must be >= 1")
+    out = _ensure_results_dir(a.results_dir)
+
+    distribution = a.replicates > 1
+    agg = SummaryAggregator(
+        metrics=DISTRIBUTION_METRICS,
+        sketch_k=a.sketch_k,
+        flush_every=a.flush_every if distribution else 0,
+        csv_path=out / "summary_distribution.csv" if distribution else None,
+        md_path=out / "summary_distribution.md" if distribution else None,
+    )
 
     # --- Escenarios 100% compatibles con Scenario(fields) ---
     # NOTA: aquí NO inventamos campos. Sólo usamos los que existen (filtrados).
@@ -133,44 +380,44 @@ def main() -> int:
               cruise_days=210)),
     ]
 
-    rows = []
-    for sid, kw in scenarios:
-        kw = _filter_kwargs(kw)
-        sc = Scenario(**kw)
-
-        result = simulate(sc, seed=123)
-        r = _extract_result(result)
-
-        # Save JSON artifact
-        art = {
-            "scenario_id": sid,
-            "scenario": asdict(sc),
-            "result_summary": {
-                "collapsed": r["collapsed"],
-                "collapse_day": r["collapse_day"],
-                "dose_msv": r["dose_msv"],
-            },
-        }
-        (out / f"{sid}.json").write_text(json.dumps(art, indent=2), encoding="utf-8")
+    scs = [(sid, Scenario(**_filter_kwargs(kw))) for sid, kw in scenarios]
+    # Only replicate 0 keeps its series (one slab slot per scenario), so the slab
+    # does not grow with --replicates.
+    tasks = [
+        SweepTask(task_id=i * a.replicates + rep, scenario=sc, seed=a.seed + rep, slot=None if rep else i)
+        for i, (sid, sc) in enumerate(scs)
+        for rep in range(a.replicates)
+    ]
+    check_task_ids(tasks)
 
-        # Plot if series exist
-        if r["t_days"] is not None and r["o2_series"] is not None:
-            _plot_series(out / f"{sid}_o2.png", r["t_days"], r["o2_series"],
-                         f"{sid}: O2 stock (days of coverage)", "Day", "O2 stock (days)")
-        if r["t_days"] is not None and r["water_series"] is not None:
-            _plot_series(out / f"{sid}_water.png", r["t_days"], r["water_series"],
-                         f"{sid}: Water stock (days of coverage)", "Day", "Water stock (days)")
+    # Workers write series into the slab and return only TrajectoryRef descriptors.
+    tmpdir = None
+    if a.slab:
+        slab_path = Path(a.slab)
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="marte_slab_")
+        slab_path = Path(tmpdir) / "trajectories.f64"
+    spec = create_slab(slab_path, n_slots(tasks), max_steps(tasks), max_resources(tasks))
 
-        row = {"scenario_id": sid, **asdict(sc)}
-        row["collapsed"] = r["collapsed"]
-        row["collapse_day"] = r["collapse_day"]
-        row["dose_msv"] = r["dose_msv"]
-        rows.append(row)
+    catalog = ResultsCatalog(a.catalog) if a.catalog else None
+    try:
+        with catalog.bulk() if catalog is not None else contextlib.nullcontext():
+            rows = asyncio.run(_pipeline(a, scs, tasks, spec, out, agg, catalog))
+    finally:
+        if catalog is not None:
+            catalog.close()
+        release_slab(spec)
+        if tmpdir is not None:
+            remove_slab(spec)
+            shutil.rmtree(tmpdir, ignore_errors=True)
 
     _write_summary_csv(out / "summary.csv", rows)
     _write_summary_md(out / "summary.md", rows)
+    if distribution:
+        agg.flush()
+        print(f"OK: wrote {out}/summary_distribution.csv and {out}/summary_distribution.md.")
 
-    print("OK: wrote results/summary.csv and results/summary.md and per-scenario artifacts.")
+    print(f"OK: wrote {out}/summary.csv and {out}/summary.md and per-scenario artifacts.")
     return 0
 
 if __name__ == "__main__":
@@ -0,0 +1,312 @@
+"""
+scripts/summary_stream.py
+
+Streaming, mergeable summaries for replicate-heavy scenario sweeps.
+
+Each scenario id keeps:
+- run / collapse counts (exact),
+- running mean/variance per metric (exact, Chan et al. pairwise merge),
+- a KLL quantile sketch per metric (bounded memory, mergeable across shards).
+
+Memory per scenario is O(sketch_k) per metric, independent of the replicate count.
+Metrics are whatever the caller feeds (e.g. collapse_day, dose_msv, o2_min_stock_days);
+missing values (None / NaN) are skipped, so collapse_day only sees collapsed runs.
+"""
+
+from __future__ import annotations
+
+import csv
+import math
+from pathlib import Path
+from typing import Iterable, Mapping
+
+SUMMARY_QUANTILES = (0.05, 0.5, 0.95)
+
+class RunningMoments:
+    """Count / mean / M2 / min / max with exact pairwise merge."""
+
+    __slots__ = ("n", "mean", "m2", "min", "max")
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        d = x - self.mean
+        self.mean += d / self.n
+        self.m2 += d * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def merge(self, other: "RunningMoments") -> None:
+        if other.n == 0:
+            return
+        if self.n == 0:
+            self.n, self.mean, self.m2 = other.n, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+        n = self.n + other.n
+        d = other.mean - self.mean
+        self.mean += d * other.n / n
+        self.m2 += other.m2 + d * d * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        # Sample variance; undefined below two observations.
+        return self.m2 / (self.n - 1) if self.n > 1 else math.nan
+
+    @property
+    def std(self) -> float:
+        v = self.variance
+        return math.sqrt(v) if v == v else math.nan
+
+class QuantileSketch:
+    """
+    KLL quantile sketch (Karnin, Lang & Liberty, 2016).
+
+    Level h holds items of weight 2**h. A full level is sorted and every other item
+    is promoted to the next level. Capacities shrink geometrically (factor 2/3) towards
+    the bottom, so total storage stays O(k) regardless of n. Until the first compaction
+    (n <= k) quantiles are exact.
+
+    Compaction offsets alternate deterministically instead of using a coin flip, so
+    re-running the same sweep (or the same shard merge order) reproduces the same summary.
+    """
+
+    def __init__(self, k: int = 200) -> None:
+        if k < 8:
+            raise ValueError("k must be >= 8")
+        self.k = k
+        self.n = 0
+        self.levels: list[list[float]] = [[]]
+        self._offset = 0
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.levels) - h - 1
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _size(self) -> int:
+        return sum(len(lv) for lv in self.levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def _compress(self) -> None:
+        while self._size() >= self._max_size():
+            for h in range(len(self.levels)):
+                if len(self.levels[h]) >= self._capacity(h):
+                    if h + 1 == len(self.levels):
+                        self.levels.append([])
+                    buf = sorted(self.levels[h])
+                    # Odd item stays at this level so weight is conserved exactly.
+                    keep = [buf.pop()] if len(buf) % 2 else []
+                    self.levels[h + 1].extend(buf[self._offset::2])
+                    self._offset ^= 1
+                    self.levels[h] = keep
+                    break
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        self.levels[0].append(float(x))
+        if len(self.levels[0]) >= self._capacity(0) and self._size() >= self._max_size():
+            self._compress()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.k != self.k:
+            raise ValueError("Cannot merge sketches with different k")
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for h, lv in enumerate(other.levels):
+            self.levels[h].extend(lv)
+        self.n += other.n
+        self._compress()
+
+    def quantile(self, q: float) -> float:
+        if not (0.0 <= q <= 1.0):
+            raise ValueError("q must be in [0,1]")
+        items = sorted((x, 1 << h) for h, lv in enumerate(self.levels) for x in lv)
+        if not items:
+            return math.nan
+        total = sum(w for _, w in items)
+        target = q * total
+        acc = 0
+        for x, w in items:
+            acc += w
+            if acc >= target:
+                return x
+        return items[-1][0]
+
+class MetricSummary:
+    __slots__ = ("moments", "sketch")
+
+    def __init__(self, sketch_k: int) -> None:
+        self.moments = RunningMoments()
+        self.sketch = QuantileSketch(sketch_k)
+
+    def add(self, x: float) -> None:
+        self.moments.add(x)
+        self.sketch.add(x)
+
+    def merge(self, other: "MetricSummary") -> None:
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+
+class ScenarioSummary:
+    def __init__(self, sketch_k: int) -> None:
+        self.sketch_k = sketch_k
+        self.runs = 0
+        self.collapsed_runs = 0
+        self.metrics: dict[str, MetricSummary] = {}
+
+    def _metric(self, name: str) -> MetricSummary:
+        m = self.metrics.get(name)
+        if m is None:
+            m = self.metrics[name] = MetricSummary(self.sketch_k)
+        return m
+
+    def add(self, collapsed: bool, metrics: Mapping[str, float | None]) -> None:
+        self.runs += 1
+        if collapsed:
+            self.collapsed_runs += 1
+        for name, v in metrics.items():
+            if v is None:
+                continue
+            v = float(v)
+            if math.isfinite(v):
+                self._metric(name).add(v)
+
+    def merge(self, other: "ScenarioSummary") -> None:
+        self.runs += other.runs
+        self.collapsed_runs += other.collapsed_runs
+        for name, m in other.metrics.items():
+            self._metric(name).merge(m)
+
+    @property
+    def collapse_rate(self) -> float:
+        return self.collapsed_runs / self.runs if self.runs else math.nan
+
+class SummaryAggregator:
+    """
+    Incremental per-scenario aggregator.
+
+    add() is O(1) amortized; rows()/write_*() can be called at any time to get a
+    partial summary. With flush_every > 0 and output paths set, the partial CSV/Markdown
+    summaries are rewritten every `flush_every` runs.
+    """
+
+    def __init__(
+        self,
+        metrics: Iterable[str] = (),
+        sketch_k: int = 200,
+        flush_every: int = 0,
+        csv_path: Path | None = None,
+        md_path: Path | None = None,
+    ) -> None:
+        self.metric_names = list(metrics)
+        self.sketch_k = sketch_k
+        self.flush_every = flush_every
+        self.csv_path = csv_path
+        self.md_path = md_path
+        self.scenarios: dict[str, ScenarioSummary] = {}
+        self._since_flush = 0
+
+    def _scenario(self, scenario_id: str) -> ScenarioSummary:
+        s = self.scenarios.get(scenario_id)
+        if s is None:
+            s = self.scenarios[scenario_id] = ScenarioSummary(self.sketch_k)
+        return s
+
+    def _note_metrics(self, names: Iterable[str]) -> None:
+        for name in names:
+            if name not in self.metric_names:
+                self.metric_names.append(name)
+
+    def add(self, scenario_id: str, collapsed: bool, metrics: Mapping[str, float | None]) -> None:
+        self._note_metrics(metrics.keys())
+        self._scenario(scenario_id).add(bool(collapsed), metrics)
+        self._since_flush += 1
+        if self.flush_every > 0 and self._since_flush >= self.flush_every:
+            self.flush()
+
+    def merge(self, other: "SummaryAggregator") -> None:
+        """Fold a shard-level aggregator into this one."""
+        if other.sketch_k != self.sketch_k:
+            raise ValueError("Cannot merge aggregators with different sketch_k")
+        self._note_metrics(other.metric_names)
+        for sid, s in other.scenarios.items():
+            self._scenario(sid).merge(s)
+
+    def columns(self) -> list[str]:
+        cols = ["scenario_id", "runs", "collapsed_runs", "collapse_rate"]
+        for name in self.metric_names:
+            cols += [f"{name}_n", f"{name}_mean", f"{name}_std", f"{name}_min"]
+            cols += [f"{name}_p{int(round(q * 100)):02d}" for q in SUMMARY_QUANTILES]
+            cols += [f"{name}_max"]
+        return cols
+
+    def rows(self) -> list[dict]:
+        rows = []
+        for sid, s in self.scenarios.items():
+            row: dict = {
+                "scenario_id": sid,
+                "runs": s.runs,
+                "collapsed_runs": s.collapsed_runs,
+                "collapse_rate": s.collapse_rate,
+            }
+            for name in self.metric_names:
+                m = s.metrics.get(name)
+                if m is None or m.moments.n == 0:
+                    row[f"{name}_n"] = 0
+                    continue
+                row[f"{name}_n"] = m.moments.n
+                row[f"{name}_mean"] = m.moments.mean
+                row[f"{name}_std"] = m.moments.std
+                row[f"{name}_min"] = m.moments.min
+                for q in SUMMARY_QUANTILES:
+                    row[f"{name}_p{int(round(q * 100)):02d}"] = m.sketch.quantile(q)
+                row[f"{name}_max"] = m.moments.max
+            rows.append(row)
+        return rows
+
+    def write_csv(self, path: Path) -> None:
+        cols = self.columns()
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with tmp.open("w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=cols)
+            w.writeheader()
+            for r in self.rows():
+                w.writerow({k: r.get(k, "") for k in cols})
+        tmp.replace(path)
+
+    def write_md(self, path: Path) -> None:
+        cols = self.columns()
+        lines = []
+        lines.append("| " + " | ".join(cols) + " |")
+        lines.append("| " + " | ".join(["---"]*len(cols)) + " |")
+        for r in self.rows():
+            vals = []
+            for c in cols:
+                v = r.get(c, "")
+                if isinstance(v, float):
+                    v = f"{v:.4g}"
+                vals.append(str(v))
+            lines.append("| " + " | ".join(vals) + " |")
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        tmp.replace(path)
+
+    def flush(self) -> None:
+        self._since_flush = 0
+        if self.csv_path is not None:
+            self.write_csv(self.csv_path)
+        if self.md_path is not None:
+            self.write_md(self.md_path)
@@ -0,0 +1,197 @@
+"""
+scripts/sweep.py
+
+Process-pool scenario sweeps with zero-copy trajectory hand-off.
+
+Workers write every resource's stock series straight into a preallocated np.memmap slab
+(shape: resources x slots x max_steps, float64) at the task's slot and return only a
+small TrajectoryRef. Nothing larger than a Scenario goes through the pool pipe, and
+readers (summary writers, plotters) get views into the slab, not copies.
+
+Only tasks with a slot keep their series; the rest report per-resource minima in the
+ref, so the slab stays as small as the number of trajectories actually needed (e.g.
+one per scenario, however many Monte Carlo replicates run).
+
+The slab is a plain file, so it works with both fork and spawn start methods
+(Linux/Windows CI) and can be reopened later by figure scripts.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from models.model import Scenario, resource_table, simulate, simulate_steps
+
+@dataclass(frozen=True)
+class SlabSpec:
+    path: str
+    n_slots: int
+    max_steps: int
+    n_resources: int = 2
+
+    @property
+    def shape(self) -> tuple[int, int, int]:
+        return (self.n_resources, self.n_slots, self.max_steps)
+
+@dataclass(frozen=True)
+class TrajectoryRef:
+    """What a worker returns: where its series live in the slab plus scalar outcomes."""
+    task_id: int
+    steps: int
+    dt_days: float
+    collapsed: bool
+    collapse_day: float | None
+    dose_msv: float
+    resources: tuple[str, ...] = ("o2", "water")
+    collapse_resource: str | None = None
+    # Minimum of each resource's series (same order as `resources`).
+    min_stock_days: tuple[float, ...] = ()
+    slot: int | None = None
+
+@dataclass(frozen=True)
+class SweepTask:
+    task_id: int
+    scenario: Scenario
+    seed: int
+    # Slab row for the series; None = keep only the scalar outcomes and minima.
+    slot: int | None = None
+
+def create_slab(path: Path, n_slots: int, max_steps: int, n_resources: int = 2) -> SlabSpec:
+    spec = SlabSpec(path=str(path), n_slots=max(1, n_slots), max_steps=max(1, max_steps), n_resources=n_resources)
+    mm = np.memmap(spec.path, dtype=np.float64, mode="w+", shape=spec.shape)
+    del mm
+    Path(spec.path + ".json").write_text(json.dumps(asdict(spec)), encoding="utf-8")
+    return spec
+
+def load_slab_spec(path: Path) -> SlabSpec:
+    """Recover the spec written next to a slab by create_slab()."""
+    return SlabSpec(**json.loads(Path(str(path) + ".json").read_text(encoding="utf-8")))
+
+def open_slab(spec: SlabSpec, mode: str = "r") -> np.memmap:
+    return np.memmap(spec.path, dtype=np.float64, mode=mode, shape=spec.shape)
+
+def trajectory(slab: np.ndarray, ref: TrajectoryRef) -> dict:
+    """Views (no copies) of one task's series, keyed like simulate()'s result."""
+    if ref.slot is None:
+        raise ValueError(f"task {ref.task_id} has no slab slot (series not kept)")
+    block = slab[:len(ref.resources), ref.slot, :ref.steps]
+    out = {f"{name}_stock_days": block[k] for k, name in enumerate(ref.resources)}
+    out["stock_days"] = block
+    out["t_days"] = np.arange(ref.steps) * ref.dt_days
+    return out
+
+# One writable mapping per slab per worker process, reused across tasks.
+_WORKER_SLABS: dict[str, np.memmap] = {}
+
+def _worker_slab(spec: SlabSpec) -> np.memmap:
+    mm = _WORKER_SLABS.get(spec.path)
+    if mm is None:
+        mm = _WORKER_SLABS[spec.path] = open_slab(spec, mode="r+")
+    return mm
+
+def _run_task(spec: SlabSpec, task: SweepTask) -> TrajectoryRef:
+    steps = simulate_steps(task.scenario)
+    n_res = len(resource_table(task.scenario).names)
+    out = None if task.slot is None else _worker_slab(spec)[:n_res, task.slot, :steps]
+    res = simulate(task.scenario, seed=task.seed, stocks_out=out)
+    return TrajectoryRef(
+        task_id=task.task_id,
+        steps=steps,
+        dt_days=float(task.scenario.dt_days),
+        collapsed=bool(res["collapsed"]),
+        collapse_day=res["collapse_day"],
+        dose_msv=float(res["dose_msv_total"]),
+        resources=tuple(res["resources"]),
+        collapse_resource=res["collapse_resource"],
+        min_stock_days=tuple(float(v) for v in res["stock_days"].min(axis=1)),
+        slot=task.slot,
+    )
+
+def run_chunk(spec: SlabSpec, tasks: Sequence[SweepTask]) -> list[TrajectoryRef]:
+    """Worker entry point: simulate `tasks` into the slab, return their refs."""
+    refs = [_run_task(spec, t) for t in tasks]
+    mm = _WORKER_SLABS.get(spec.path)
+    if mm is not None:
+        mm.flush()
+    return refs
+
+def release_slab(spec: SlabSpec) -> None:
+    """Drop this process's writable mapping of the slab (needed before deleting it on Windows)."""
+    mm = _WORKER_SLABS.pop(spec.path, None)
+    if mm is not None:
+        mm.flush()
+        del mm
+
+def chunked(tasks: Sequence[SweepTask], size: int) -> Iterable[Sequence[SweepTask]]:
+    for i in range(0, len(tasks), size):
+        yield tasks[i:i + size]
+
+def default_chunk_size(n_tasks: int, workers: int) -> int:
+    # A few chunks per worker: amortizes pipe round-trips, keeps the pool balanced.
+    return max(1, n_tasks // (max(1, workers) * 4))
+
+def check_task_ids(tasks: Sequence[SweepTask]) -> None:
+    if not tasks:
+        raise RuntimeError("No sweep tasks.")
+    ids = sorted(t.task_id for t in tasks)
+    if ids != list(range(len(tasks))):
+        raise ValueError("task ids must be 0..n-1")
+    slots = [t.slot for t in tasks if t.slot is not None]
+    if len(set(slots)) != len(slots) or any(s < 0 for s in slots):
+        raise ValueError("slots must be distinct and >= 0")
+
+def n_slots(tasks: Sequence[SweepTask]) -> int:
+    return 1 + max((t.slot for t in tasks if t.slot is not None), default=-1)
+
+def max_steps(tasks: Sequence[SweepTask]) -> int:
+    return max((simulate_steps(t.scenario) for t in tasks if t.slot is not None), default=1)
+
+def max_resources(tasks: Sequence[SweepTask]) -> int:
+    return max(len(resource_table(t.scenario).names) for t in tasks)
+
+def run_sweep(
+    tasks: Sequence[SweepTask],
+    slab_path: Path,
+    workers: int = 1,
+    chunk_size: int = 0,
+) -> tuple[SlabSpec, list[TrajectoryRef]]:
+    """
+    Run every task, writing the series of slotted tasks into a new slab at `slab_path`.
+
+    Returns the slab spec and refs ordered by task id. workers <= 1 runs in-process
+    through the same slab path so both modes produce identical artifacts.
+    """
+    check_task_ids(tasks)
+    spec = create_slab(slab_path, n_slots(tasks), max_steps(tasks), max_resources(tasks))
+    if chunk_size <= 0:
+        chunk_size = default_chunk_size(len(tasks), workers)
+
+    refs: list[TrajectoryRef] = []
+    try:
+        if workers <= 1:
+            for chunk in chunked(tasks, chunk_size):
+                refs.extend(run_chunk(spec, chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                futs = [ex.submit(run_chunk, spec, chunk) for chunk in chunked(tasks, chunk_size)]
+                for f in futs:
+                    refs.extend(f.result())
+    finally:
+        release_slab(spec)
+
+    refs.sort(key=lambda r: r.task_id)
+    return spec, refs
+
+def remove_slab(spec: SlabSpec) -> None:
+    for p in (spec.path, spec.path + ".json"):
+        try:
+            os.remove(p)
+        except FileNotFoundError:
+            pass
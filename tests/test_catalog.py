@@ -0,0 +1,80 @@
+import random
+from dataclasses import replace
+
+from models.model import Scenario
+from scripts.catalog import ResultsCatalog, catalog_row
+
+BASE = Scenario(
+    N0=12, years=10, dt_days=1.0,
+    o2_storage_days=365, water_storage_days=365,
+    o2_local_fraction=0.97, water_local_fraction=0.98,
+    water_recovery_fraction=0.98,
+    launch_window_days=780, missed_window_probability=0.2,
+    import_restore_fraction_o2=1.0, import_restore_fraction_water=1.0,
+    cruise_days=210,
+)
+
+def test_range_query_matches_filter_and_uses_index(tmp_path):
+    rnd = random.Random(2)
+    runs = []
+    for i in range(2000):
+        sc = replace(BASE, N0=rnd.randint(1, 100), o2_local_fraction=rnd.uniform(0.95, 1.0))
+        runs.append((sc, i, rnd.random() < 0.3))
+
+    with ResultsCatalog(tmp_path / "cat.sqlite") as cat:
+        n = cat.add_runs(
+            catalog_row("S", sc, seed, {"collapsed": collapsed, "dose_msv": 1.0, "spares_min_stock_days": 3.0})
+            for sc, seed, collapsed in runs
+        )
+        assert n == 2000
+
+        got = cat.query("N0>=10", "N0<=50", "o2_local_fraction>0.98", "collapsed=1", columns=["seed"])
+        want = [seed for sc, seed, c in runs if 10 <= sc.N0 <= 50 and sc.o2_local_fraction > 0.98 and c]
+        assert sorted(r["seed"] for r in got) == sorted(want)
+
+        plan = cat.conn.execute("EXPLAIN QUERY PLAN SELECT seed FROM runs WHERE N0 BETWEEN 10 AND 50").fetchall()
+        assert any("INDEX" in str(row) for row in plan)
+
+        row = cat.query("seed=0")[0]
+        assert row["engine_version"] and len(row["constants_hash"]) == 64
+        assert '"spares_min_stock_days": 3.0' in row["metrics"]
+
+def test_rejects_unknown_columns(tmp_path):
+    with ResultsCatalog(tmp_path / "cat.sqlite") as cat:
+        try:
+            cat.query("bogus>=1")
+            assert False, "Expected ValueError"
+        except ValueError:
+            assert True
+        # Values are bound parameters, never spliced into SQL.
+        assert cat.query("scenario_id=x; DROP TABLE runs") == []
+        assert cat.count() == 0
+
+def test_reingesting_runs_is_a_noop(tmp_path):
+    rows = [catalog_row("S", BASE, seed, {"collapsed": False}) for seed in (1, 2, None)]
+    with ResultsCatalog(tmp_path / "cat.sqlite") as cat:
+        assert cat.add_runs(rows) == 3
+        assert cat.add_runs(rows) == 0
+        assert cat.add_runs([catalog_row("S", replace(BASE, N0=13), 1, {"collapsed": False})]) == 1
+        assert cat.count() == 4
+
+def test_collapsed_filter_uses_the_parameter_range_index(tmp_path):
+    rnd = random.Random(5)
+    with ResultsCatalog(tmp_path / "cat.sqlite") as cat:
+        with cat.bulk():
+            for chunk in range(4):
+                rows = []
+                for i in range(1000):
+                    collapsed = rnd.random() < 0.3
+                    sc = replace(BASE, o2_storage_days=rnd.uniform(100, 800))
+                    rows.append(catalog_row("S", sc, chunk * 1000 + i, {
+                        "collapsed": collapsed, "collapse_day": rnd.uniform(0, 3650) if collapsed else None,
+                    }))
+                cat.add_runs(rows)
+        for conds, index in [
+            (("collapse_day<100", "collapsed=1"), "idx_runs_collapse_day"),
+            (("o2_storage_days>790", "collapsed=1"), "idx_runs_o2_storage_days"),
+        ]:
+            where, params = cat._where(conds)
+            plan = str(cat.conn.execute("EXPLAIN QUERY PLAN SELECT COUNT(*) FROM runs" + where, params).fetchall())
+            assert index in plan, plan
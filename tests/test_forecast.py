@@ -0,0 +1,57 @@
+from dataclasses import replace
+
+import numpy as np
+
+from models.forecast import Forecaster, forecast, state_from_run
+from models.model import Scenario, simulate
+
+SC = Scenario(
+    N0=12, years=20, dt_days=1.0,
+    o2_storage_days=150, water_storage_days=300,
+    o2_local_fraction=0.8, water_local_fraction=0.95,
+    water_recovery_fraction=0.9,
+    launch_window_days=100, missed_window_probability=0.6,
+    import_restore_fraction_o2=0.5, import_restore_fraction_water=0.3,
+    cruise_days=210,
+)
+
+def test_deterministic_continuation_matches_simulate():
+    for p in (0.0, 1.0):
+        sc = replace(SC, missed_window_probability=p)
+        res = simulate(sc, seed=0)
+        for day in (0, 99, 100, 250, 701):
+            if res["collapsed"] and day >= res["collapse_day"]:
+                continue
+            f = forecast(sc, state_from_run(sc, res, day), samples=8)
+            assert f.collapse_probability == float(res["collapsed"])
+            got = f.depletion_quantiles[0.5]
+            if res["collapsed"]:
+                # Exact-zero hits may round one step apart (cumsum vs closed form).
+                assert abs(got - (res["collapse_day"] - day)) <= sc.dt_days
+            else:
+                assert got is None
+            if res["collapsed"]:
+                assert f.collapse_resource_share[res["collapse_resource"]] == 1.0
+            else:
+                assert abs(f.dose_msv_mean - res["dose_msv_total"]) < 1e-6
+
+def test_collapse_probability_agrees_with_simulate():
+    runs = [simulate(SC, seed=s)["collapsed"] for s in range(1500)]
+    f = forecast(SC, state_from_run(SC, simulate(SC, seed=0), 0), samples=20000)
+    assert abs(f.collapse_probability - np.mean(runs)) < 0.05
+
+def test_streaming_reuses_samples_when_state_tracks_projection():
+    fc = Forecaster(SC, samples=2000)
+    st = state_from_run(SC, simulate(SC, seed=1), 20)
+    first = fc.observe(st)
+    assert not first.reused
+
+    draw = {"o2": 0.2, "water": (1 - 0.95) * (1 - 0.9)}
+    f = fc.update(day=30.0, stock_days={k: v - 10 * draw[k] for k, v in st.stock_days.items()})
+    assert f.reused
+    assert f.collapse_probability == first.collapse_probability
+    assert f.depletion_quantiles[0.05] == first.depletion_quantiles[0.05] - 10
+
+    f = fc.update(stock_days={k: v - 5 for k, v in fc.state.stock_days.items()})
+    assert not f.reused
+    assert f.collapse_probability >= first.collapse_probability
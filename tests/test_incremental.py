@@ -0,0 +1,54 @@
+import numpy as np
+
+from models.incremental import IncrementalSimulator
+from models.model import Scenario, simulate
+
+def _same(a, b):
+    for key, v in b.items():
+        if isinstance(v, np.ndarray):
+            assert np.array_equal(a[key], v), key
+        else:
+            assert a[key] == v, key
+
+def test_incremental_edits_match_full_simulation():
+    sc = Scenario(
+        N0=12, years=12, dt_days=1.0,
+        o2_storage_days=200, water_storage_days=300,
+        o2_local_fraction=0.97, water_local_fraction=0.98,
+        water_recovery_fraction=0.98,
+        launch_window_days=100, missed_window_probability=0.3,
+        import_restore_fraction_o2=0.2, import_restore_fraction_water=0.2,
+        cruise_days=210,
+    )
+    inc = IncrementalSimulator(sc, seed=4)
+    _same(inc.result, simulate(sc, seed=4))
+
+    edits = [
+        dict(cruise_days=120),
+        dict(N0=40),
+        dict(missed_window_probability=0.6),
+        dict(import_restore_fraction_o2=0.05),
+        dict(years=20),
+        dict(years=3),
+        dict(launch_window_days=780),
+        dict(o2_local_fraction=0.99),
+    ]
+    for kw in edits:
+        res = inc.update(**kw)
+        _same(res, simulate(inc.sc, seed=4))
+
+def test_dose_only_edit_reuses_trajectory():
+    sc = Scenario(
+        N0=12, years=100, dt_days=1.0,
+        o2_storage_days=365, water_storage_days=365,
+        o2_local_fraction=0.99, water_local_fraction=0.995,
+        water_recovery_fraction=0.98,
+        launch_window_days=780, missed_window_probability=0.2,
+        import_restore_fraction_o2=0.2, import_restore_fraction_water=0.2,
+        cruise_days=210,
+    )
+    inc = IncrementalSimulator(sc)
+    inc.update(cruise_days=180)
+    assert inc.last_resume_step is None
+    inc.update(missed_window_probability=0.21)
+    assert inc.last_resume_step is None or inc.last_resume_step >= 780
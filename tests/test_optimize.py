@@ -0,0 +1,43 @@
+from models.model import Scenario
+from models.optimize import clopper_pearson_upper, optimize_design
+
+def test_clopper_pearson_zero_failures():
+    # k = 0 has the closed form 1 - alpha**(1/n)
+    assert abs(clopper_pearson_upper(0, 200, 0.95) - (1 - 0.05 ** (1 / 200))) < 1e-9
+
+def test_optimizer_finds_minimal_certified_storage():
+    base = Scenario(
+        N0=4, years=3, dt_days=1.0,
+        o2_storage_days=400, water_storage_days=400,
+        o2_local_fraction=0.95, water_local_fraction=0.9,
+        water_recovery_fraction=0.5,
+        launch_window_days=0, missed_window_probability=0.0,
+        import_restore_fraction_o2=0.0, import_restore_fraction_water=0.0,
+        cruise_days=0,
+    )
+    res = optimize_design(
+        base, {"water_storage_days": (1.0, 200.0)}, risk_target=0.05,
+        crn_runs=2, verify_runs=100, max_generations=60, seed=1,
+    )
+    # Net water draw is 0.05 days/day over 1095 days -> ~54.75 days needed.
+    need = (1 - 0.9) * (1 - 0.5) * 1095
+    assert res.certificate.feasible
+    assert need <= res.scenario.water_storage_days < need * 1.05
+    assert res.model_evaluations < 200 * 2 + 100
+
+def test_optimizer_rejects_seeds_overlapping_verification():
+    base = Scenario(
+        N0=4, years=1, dt_days=1.0,
+        o2_storage_days=400, water_storage_days=400,
+        o2_local_fraction=0.95, water_local_fraction=0.9,
+        water_recovery_fraction=0.5,
+        launch_window_days=0, missed_window_probability=0.0,
+        import_restore_fraction_o2=0.0, import_restore_fraction_water=0.0,
+        cruise_days=0,
+    )
+    try:
+        optimize_design(base, {"water_storage_days": (1.0, 200.0)}, risk_target=0.05,
+                        crn_runs=64, max_rounds=4, seed=1_000_000 - 100)
+        assert False, "Expected ValueError"
+    except ValueError:
+        assert True
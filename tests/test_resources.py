@@ -0,0 +1,48 @@
+from dataclasses import replace
+
+import numpy as np
+
+from models.model import ResourceSpec, Scenario, simulate
+from models.verified_constants import MOXIE_TOTAL_O2_G, O2_KG_PER_CREW_MEMBER_DAY
+
+BASE = Scenario(
+    N0=12, years=5, dt_days=1.0,
+    o2_storage_days=300, water_storage_days=365,
+    o2_local_fraction=0.9, water_local_fraction=0.98,
+    water_recovery_fraction=0.98,
+    launch_window_days=780, missed_window_probability=0.3,
+    import_restore_fraction_o2=0.5, import_restore_fraction_water=0.5,
+    cruise_days=210,
+)
+
+def _extra(storage_days, local_fraction):
+    # Engine tests reuse the verified per-crew O2 demand (kg/(crew-member*day)).
+    return ResourceSpec(name="spares", demand=O2_KG_PER_CREW_MEMBER_DAY,
+                        storage_days=storage_days, local_fraction=local_fraction)
+
+def test_extra_resource_leaves_builtin_stocks_unchanged():
+    a = simulate(BASE, seed=9)
+    b = simulate(replace(BASE, extra_resources=(_extra(1e6, 0.5),)), seed=9)
+    assert b["resources"] == ("o2", "water", "spares")
+    assert np.array_equal(a["o2_stock_days"], b["o2_stock_days"])
+    assert np.array_equal(a["water_stock_days"], b["water_stock_days"])
+    assert (a["collapsed"], a["collapse_day"]) == (b["collapsed"], b["collapse_day"])
+
+def test_collapse_reports_responsible_resource():
+    res = simulate(replace(BASE, extra_resources=(_extra(50, 0.0),)), seed=9)
+    assert res["collapsed"]
+    assert res["collapse_resource"] == "spares"
+    assert res["collapse_day"] == 49.0
+
+def test_extra_resource_requires_verified_demand():
+    for demand in (
+        1.8,
+        MOXIE_TOTAL_O2_G,  # verified, but grams of total output, not kg per crew-day
+        replace(O2_KG_PER_CREW_MEMBER_DAY, value=0.1),  # not the registered constant
+    ):
+        bad = ResourceSpec(name="food", demand=demand, storage_days=100, local_fraction=0.0)
+        try:
+            simulate(replace(BASE, extra_resources=(bad,)))
+            assert False, "Expected ValueError"
+        except ValueError:
+            assert True
@@ -0,0 +1,51 @@
+import csv
+
+from scripts.run_scenarios import main
+
+SCENARIOS = ["S1_baseline", "S2_higher_closure_buffers", "S3_scale_stress"]
+
+def _summary_ids(out):
+    with (out / "summary.csv").open(encoding="utf-8") as f:
+        return [r["scenario_id"] for r in csv.DictReader(f)]
+
+def test_pipeline_keeps_scenario_order_without_plots(tmp_path):
+    assert main(["--results-dir", str(tmp_path), "--workers", "2", "--no-plots",
+                 "--chunk-size", "1", "--replicates", "3"]) == 0
+    assert _summary_ids(tmp_path) == SCENARIOS
+    assert (tmp_path / "summary_distribution.csv").exists()
+    assert not list(tmp_path.glob("*.png"))
+
+def test_pipeline_renders_resource_plots(tmp_path):
+    assert main(["--results-dir", str(tmp_path), "--chunk-size", "1"]) == 0
+    assert _summary_ids(tmp_path) == SCENARIOS
+    for sid in SCENARIOS:
+        for name in ("o2", "water"):
+            assert (tmp_path / f"{sid}_{name}.png").exists()
+
+def test_summary_writers_include_extra_resource_parameters(tmp_path):
+    from models.model import ResourceSpec, Scenario
+    from models.verified_constants import O2_KG_PER_CREW_MEMBER_DAY
+    from scripts.run_scenarios import _summary_row, _write_summary_csv, _write_summary_md
+
+    sc = Scenario(
+        N0=12, years=1, dt_days=1.0,
+        o2_storage_days=365, water_storage_days=365,
+        o2_local_fraction=0.97, water_local_fraction=0.98,
+        water_recovery_fraction=0.98,
+        launch_window_days=780, missed_window_probability=0.2,
+        import_restore_fraction_o2=1.0, import_restore_fraction_water=1.0,
+        cruise_days=210,
+        extra_resources=(ResourceSpec("spares", O2_KG_PER_CREW_MEMBER_DAY, 90, 0.5, 0.1, 0.4),),
+    )
+    result = {"collapsed": False, "collapse_day": None, "collapse_resource": None, "dose_msv": 1.0}
+    rows = [_summary_row("S", sc, result)]
+    _write_summary_csv(tmp_path / "summary.csv", rows)
+    _write_summary_md(tmp_path / "summary.md", rows)
+
+    with (tmp_path / "summary.csv").open(encoding="utf-8") as f:
+        row = next(csv.DictReader(f))
+    assert (row["o2_storage_days"], row["import_restore_fraction_water"]) == ("365", "1.0")
+    assert (row["spares_storage_days"], row["spares_local_fraction"]) == ("90", "0.5")
+    assert (row["spares_recovery_fraction"], row["spares_import_restore_fraction"]) == ("0.1", "0.4")
+    assert "o2_recovery_fraction" not in row
+    assert "spares_storage_days" in (tmp_path / "summary.md").read_text(encoding="utf-8")
@@ -0,0 +1,35 @@
+import random
+
+from scripts.summary_stream import QuantileSketch, SummaryAggregator
+
+def test_sketch_is_bounded_and_accurate():
+    rnd = random.Random(7)
+    xs = [rnd.random() for _ in range(50_000)]
+    sk = QuantileSketch(k=200)
+    for x in xs:
+        sk.add(x)
+    assert sum(len(lv) for lv in sk.levels) < 3 * 200
+    xs.sort()
+    for q in (0.05, 0.5, 0.95):
+        assert abs(sk.quantile(q) - xs[int(q * len(xs))]) < 0.02
+
+def test_shard_merge_matches_single_stream_moments():
+    rnd = random.Random(3)
+    runs = [(rnd.random() < 0.3, rnd.uniform(0, 3650)) for _ in range(4000)]
+
+    whole = SummaryAggregator(metrics=["collapse_day"])
+    shards = [SummaryAggregator(metrics=["collapse_day"]) for _ in range(4)]
+    for i, (collapsed, day) in enumerate(runs):
+        whole.add("S1", collapsed, {"collapse_day": day if collapsed else None})
+        shards[i % 4].add("S1", collapsed, {"collapse_day": day if collapsed else None})
+
+    merged = shards[0]
+    for s in shards[1:]:
+        merged.merge(s)
+
+    a, b = whole.rows()[0], merged.rows()[0]
+    assert a["runs"] == b["runs"] == 4000
+    assert a["collapsed_runs"] == b["collapsed_runs"]
+    assert abs(a["collapse_day_mean"] - b["collapse_day_mean"]) < 1e-9
+    assert abs(a["collapse_day_std"] - b["collapse_day_std"]) < 1e-9
+    assert abs(a["collapse_day_p50"] - b["collapse_day_p50"]) < 0.02 * 3650
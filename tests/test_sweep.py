@@ -0,0 +1,39 @@
+import numpy as np
+
+from models.model import Scenario, simulate
+from scripts.sweep import SweepTask, open_slab, run_sweep, trajectory
+
+def _scenario(years):
+    return Scenario(
+        N0=12, years=years, dt_days=1.0,
+        o2_storage_days=120, water_storage_days=365,
+        o2_local_fraction=0.9, water_local_fraction=0.98,
+        water_recovery_fraction=0.98,
+        launch_window_days=100, missed_window_probability=0.5,
+        import_restore_fraction_o2=0.5, import_restore_fraction_water=0.5,
+        cruise_days=30,
+    )
+
+def test_slab_trajectories_match_simulate(tmp_path):
+    tasks = [SweepTask(task_id=i, scenario=_scenario(1 + i % 3), seed=10 + i, slot=i) for i in range(6)]
+    spec, refs = run_sweep(tasks, tmp_path / "slab.f64", workers=2, chunk_size=2)
+    slab = open_slab(spec)
+    for t, ref in zip(tasks, refs):
+        res = simulate(t.scenario, seed=t.seed)
+        tr = trajectory(slab, ref)
+        assert np.shares_memory(tr["stock_days"], slab)
+        assert np.array_equal(tr["o2_stock_days"], res["o2_stock_days"])
+        assert np.array_equal(tr["water_stock_days"], res["water_stock_days"])
+        assert ref.collapsed == res["collapsed"]
+        assert ref.collapse_day == res["collapse_day"]
+        assert ref.dose_msv == res["dose_msv_total"]
+
+def test_unslotted_tasks_keep_only_minima(tmp_path):
+    tasks = [SweepTask(task_id=i, scenario=_scenario(2), seed=i, slot=0 if i == 3 else None) for i in range(5)]
+    spec, refs = run_sweep(tasks, tmp_path / "slab.f64", chunk_size=2)
+    assert spec.shape[1] == 1
+    slab = open_slab(spec)
+    for t, ref in zip(tasks, refs):
+        res = simulate(t.scenario, seed=t.seed)
+        assert ref.min_stock_days == (res["o2_stock_days"].min(), res["water_stock_days"].min())
+    assert np.array_equal(trajectory(slab, refs[3])["o2_stock_days"], simulate(tasks[3].scenario, seed=3)["o2_stock_days"])